@@ -0,0 +1,5 @@
+"""
+    TILES benchmark suite.
+
+    python -m benchmarks [--scales small medium large] [--modes ttl explicit]
+"""
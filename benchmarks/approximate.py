@@ -0,0 +1,108 @@
+"""
+    Approximate mode benchmark: per-edge latency and accuracy loss against the exact mode.
+
+    Every configuration runs on the same stream. The latency of the evolution
+    step (common_neighbors_analysis, the part bounded by the approximation) is
+    reported apart from the whole per-interaction latency, which also includes
+    the expiration of the old interactions and the observation output. The
+    communities of each observation are compared with the exact ones by
+    best-match Jaccard similarity (averaged over the communities of both
+    sides, 1.0 when identical).
+
+    python -m benchmarks.approximate [-n edges] [-s seed] [--stream powerlaw|planted]
+"""
+import argparse
+import tiles as t
+from tiles.alg.metrics import clock
+from .generator import generate, power_law_stream
+
+CONFIGS = [("exact", None),
+           ("cn<=256, budget 16384", dict(max_common_neighbors=256, budget=16384)),
+           ("cn<=64, budget 4096", dict(max_common_neighbors=64, budget=4096)),
+           ("cn<=16, budget 512", dict(max_common_neighbors=16, budget=512))]
+
+
+class TimedTILES(t.TILES):
+    """
+        TILES recording the duration of every evolution step
+    """
+
+    def common_neighbors_analysis(self, u, v, common_neighbors):
+        start = clock()
+        super(TimedTILES, self).common_neighbors_analysis(u, v, common_neighbors)
+        self.cna.append(clock() - start)
+
+
+def run(stream, approx):
+    tl = TimedTILES(obs=7, ttl=30, approx=t.Approximation(**approx) if approx is not None else None)
+    tl.cna = []
+    latencies = []
+    snapshots = []
+    for u, v, ts in stream:
+        start = clock()
+        snapshot = tl.process_edge(u, v, ts)
+        latencies.append(clock() - start)
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    snapshots.append(tl.close())
+    return latencies, sorted(tl.cna), snapshots, tl.metrics.totals()["counters"]
+
+
+def best_match(a, b):
+    """
+        Average over the communities of a of their best Jaccard similarity with a community of b
+    """
+    if not a:
+        return 1.0 if not b else 0.0
+    index = {}
+    for i, com in enumerate(b):
+        for n in com:
+            index.setdefault(n, []).append(i)
+    total = 0.0
+    for com in a:
+        shared = {}
+        for n in com:
+            for i in index.get(n, ()):
+                shared[i] = shared.get(i, 0) + 1
+        total += max([float(k) / (len(com) + len(b[i]) - k) for i, k in shared.items()] or [0.0])
+    return total / len(a)
+
+
+def similarity(exact, approx):
+    a = [set(c) for c in exact.communities.values()]
+    b = [set(c) for c in approx.communities.values()]
+    return (best_match(a, b) + best_match(b, a)) / 2
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--edges', type=int, default=200000, help='number of interactions')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='random seed')
+    parser.add_argument('--stream', choices=['powerlaw', 'planted'], default='powerlaw',
+                        help='hub-dominated preferential attachment or planted communities')
+    args = parser.parse_args()
+
+    if args.stream == 'powerlaw':
+        stream = list(power_law_stream(args.edges, args.seed))
+    else:
+        stream = list(generate(args.edges, seed=args.seed))
+
+    reference = None
+    print("%-24s %9s %9s %9s %13s %13s %8s %8s %11s" % (
+        "configuration", "edges/s", "p99 us", "max ms", "step p99 us", "step max ms", "sampled", "cut",
+        "similarity"))
+    for name, approx in CONFIGS:
+        latencies, steps, snapshots, counters = run(stream, approx)
+        if reference is None:
+            reference = snapshots
+        score = sum(similarity(e, a) for e, a in zip(reference, snapshots)) / len(reference)
+        total = sum(latencies)
+        latencies.sort()
+        print("%-24s %9.0f %9.1f %9.2f %13.1f %13.2f %8d %8d %11.3f" % (
+            name, len(stream) / total, percentile(latencies, 0.99) * 1e6, latencies[-1] * 1e3,
+            percentile(steps, 0.99) * 1e6, steps[-1] * 1e3, counters.get("sampled_edges", 0),
+            counters.get("exhausted_budgets", 0), score))
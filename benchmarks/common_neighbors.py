@@ -0,0 +1,63 @@
+"""
+    Common-neighbor kernel benchmark on power-law interaction streams.
+
+    Compares the degree-aware kernel of CompactGraph (scan the smaller
+    neighborhood, probe the larger one in place) with the previous approach
+    (copy both neighborhoods into sets and intersect them).
+
+    python -m benchmarks.common_neighbors [-n edges] [-s seed]
+"""
+import argparse
+import time
+import tiles as t
+from .generator import power_law_stream
+
+
+class SetIntersectionGraph(t.CompactGraph):
+    """
+        CompactGraph using the previous common-neighbor computation
+    """
+
+    def common_neighbors(self, u, v):
+        u_n = list(self.neighbors(u))
+        v_n = list(self.neighbors(v))
+        return list(set(u_n) & set(v_n))
+
+
+def run(graph, stream):
+    tl = t.TILES(g=graph, obs=7, ttl=30)
+    start = time.time()
+    for _ in tl.feed(stream):
+        pass
+    tl.close()
+    return time.time() - start, tl
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--edges', type=int, default=200000, help='number of interactions')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    stream = list(power_law_stream(args.edges, args.seed))
+
+    old, _ = run(SetIntersectionGraph(), stream)
+    new, tl = run(t.CompactGraph(), stream)
+    degrees = sorted((tl.g.degree(u) for u in tl.g.nodes()), reverse=True)
+
+    print("interactions: %d, nodes: %d, max degree: %d" % (len(stream), len(degrees), degrees[0]))
+    print("set intersection:  %.2fs (%.0f edges/s)" % (old, len(stream) / old))
+    print("degree-aware:      %.2fs (%.0f edges/s)" % (new, len(stream) / new))
+    print("speedup:           %.2fx" % (old / new))
+
+    # kernel alone on hub / low-degree pairs
+    g = tl.g
+    hubs = [u for u in g.nodes() if g.degree(u) == degrees[0]][:1]
+    leaves = [u for u in g.nodes() if 0 < g.degree(u) <= 3][:1000]
+    pairs = [(h, x) for h in hubs for x in leaves]
+    for name, kernel in [("set intersection", SetIntersectionGraph.common_neighbors),
+                         ("degree-aware", t.CompactGraph.common_neighbors)]:
+        start = time.time()
+        for u, v in pairs:
+            kernel(g, u, v)
+        print("hub kernel, %s: %.1f us/pair" % (name, (time.time() - start) / len(pairs) * 1e6))
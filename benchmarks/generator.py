@@ -0,0 +1,134 @@
+"""
+    Reproducible synthetic interaction streams for benchmarking TILES and eTILES.
+
+    Nodes belong to planted communities and pick their partners by preferential
+    attachment (power-law degrees), mostly inside their own community; a share of
+    the interactions repeats a recent pair (duplicate edges). Explicit streams
+    also carry a removal record for every edge at the end of its lifetime.
+"""
+import heapq
+import random
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+DAY = 86400
+
+# number of interactions per scale
+SCALES = {"tiny": 5000, "small": 50000, "medium": 500000, "large": 5000000}
+
+
+def generate(edges, communities=None, mixing=0.1, duplicates=0.2, new_node=0.05, explicit=False,
+             lifetime=30, seed=0, start=1500000000, rate=60):
+    """
+        Generate an interaction stream
+        :param edges: number of interactions (edge creations)
+        :param communities: number of planted communities (default: edges / 500)
+        :param mixing: probability that an interaction crosses communities
+        :param duplicates: probability that an interaction repeats a recent pair
+        :param new_node: probability that an interaction introduces a new node
+        :param explicit: emit eTILES records (action, u, v, t) with edge removals
+        :param lifetime: mean edge lifetime in days (explicit streams)
+        :param seed: random seed
+        :param start: first timestamp (epoch seconds)
+        :param rate: seconds between two interactions
+        :return: generator of (u, v, t) or (action, u, v, t) records
+    """
+    rnd = random.Random(seed)
+    if communities is None:
+        communities = max(2, edges // 500)
+
+    # degree-proportional endpoint lists, global and per community
+    endpoints = []
+    com_endpoints = [[] for _ in range(communities)]
+    membership = []
+    recent = []
+    removals = []
+    alive = {}
+
+    def new():
+        n = len(membership)
+        c = rnd.randrange(communities)
+        membership.append(c)
+        endpoints.append(n)
+        com_endpoints[c].append(n)
+        return n
+
+    for _ in range(3 * communities):
+        new()
+
+    for i in range(edges):
+        t = start + i * rate
+
+        while removals and removals[0][0] <= t:
+            rt, u, v = heapq.heappop(removals)
+            key = (u, v) if u < v else (v, u)
+            alive[key] -= 1
+            if alive[key] == 0:
+                del alive[key]
+                yield ("-", u, v, rt)
+
+        if recent and rnd.random() < duplicates:
+            u, v = recent[rnd.randrange(len(recent))]
+        else:
+            u = new() if rnd.random() < new_node else rnd.choice(endpoints)
+            c = membership[u]
+            if rnd.random() < mixing or len(com_endpoints[c]) < 2:
+                v = rnd.choice(endpoints)
+            else:
+                v = rnd.choice(com_endpoints[c])
+            if u == v:
+                v = new()
+            recent.append((u, v))
+            if len(recent) > 1000:
+                recent[rnd.randrange(1000)] = recent.pop()
+
+        for n in (u, v):
+            endpoints.append(n)
+            com_endpoints[membership[n]].append(n)
+
+        if explicit:
+            key = (u, v) if u < v else (v, u)
+            alive[key] = alive.get(key, 0) + 1
+            heapq.heappush(removals, (t + int(rnd.expovariate(1.0 / lifetime) * DAY) + 1, u, v))
+            yield ("+", u, v, t)
+        else:
+            yield (u, v, t)
+
+
+def power_law_stream(edges, seed=0, new_node=0.1, start=1500000000, rate=30):
+    """
+        Pure preferential attachment stream (no communities, no duplicates): a few very large hubs
+        :param edges: number of interactions
+        :param seed: random seed
+        :param new_node: probability that an interaction introduces a new node
+        :param start: first timestamp
+        :param rate: seconds between two interactions
+    """
+    rnd = random.Random(seed)
+    endpoints = [0, 1]
+    nodes = 2
+    for i in range(edges):
+        if rnd.random() < new_node:
+            u = nodes
+            nodes += 1
+        else:
+            u = rnd.choice(endpoints)
+        v = rnd.choice(endpoints)
+        endpoints.append(u)
+        endpoints.append(v)
+        yield u, v, start + i * rate
+
+
+def write_stream(records, filename):
+    """
+        Write a stream in the TILES (or eTILES) input format
+        :param records: iterable of records
+        :param filename: output filename
+    """
+    with open(filename, "w") as f:
+        for r in records:
+            f.write("\t".join(str(x) for x in r))
+            f.write("\n")
@@ -0,0 +1,71 @@
+"""
+    Memory footprint of the community memberships (tracemalloc).
+
+    Runs TILES on a planted-community stream, then rebuilds the final
+    memberships with the previous layout (a community -> {node: None}
+    dictionary plus a {cid: None} dictionary attached to every graph node)
+    and with the membership store, and compares the allocated bytes.
+
+    python -m benchmarks.memberships [-n edges] [-s seed]
+"""
+import argparse
+import tracemalloc
+import tiles as t
+from tiles.alg.memberships import Memberships
+from .generator import generate
+
+
+def legacy(index, communities):
+    # the node dictionaries were held by a slot of the graph node records (a list slot here)
+    by_community = {}
+    by_node = [{} for _ in index]
+    for cid, members in communities:
+        by_community[cid] = dict.fromkeys(members)
+        for n in members:
+            by_node[index[n]][cid] = None
+    return by_community, by_node
+
+
+def store(index, communities):
+    m = Memberships()
+    for cid, members in communities:
+        for n in members:
+            m.add(n, cid)
+    return m
+
+
+def measure(build, *args):
+    tracemalloc.start()
+    result = build(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--edges', type=int, default=200000, help='number of interactions')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    tl = t.TILES(obs=7, ttl=30)
+    for _ in tl.feed(generate(args.edges, seed=args.seed)):
+        pass
+
+    nodes = list(tl.g.nodes())
+    communities = [(cid, list(members)) for cid, members in tl.communities.items()]
+    n = sum(len(members) for _, members in communities)
+    members_of = {}
+    for _, members in communities:
+        for u in members:
+            members_of[u] = members_of.get(u, 0) + 1
+    print("nodes: %d, communities: %d, memberships: %d, nodes in a community: %d (%d in more than one)"
+          % (len(nodes), len(communities), n, len(members_of), sum(1 for k in members_of.values() if k > 1)))
+
+    index = dict((u, i) for i, u in enumerate(nodes))
+    old = measure(legacy, index, communities)
+    new = measure(store, index, communities)
+    print("dictionaries:     %8.1f MB (%.0f bytes/membership)" % (old / 1e6, old / float(n)))
+    print("membership store: %8.1f MB (%.0f bytes/membership)" % (new / 1e6, new / float(n)))
+    print("reduction:        %.2fx" % (old / float(new)))
@@ -0,0 +1,161 @@
+"""
+    Run the TILES benchmark scenarios and report throughput, per-phase latency and peak memory.
+
+    Every scenario (algorithm variant x scale) runs in a fresh process on a stream
+    generated once and stored in a temporary folder, so peak RSS figures are not
+    polluted by previous runs. Results can be saved as JSON and compared with a
+    previous run (e.g. produced by the previous release) to catch regressions.
+
+    python -m benchmarks [--scales small medium] [--modes ttl explicit] [--save out.json] [--baseline old.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tiles as t
+from tiles.alg.reader import read_edges
+from .generator import SCALES, generate, write_stream
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+# algorithm variants: (explicit stream, constructor parameters)
+MODES = {
+    "ttl": (False, {"obs": 7, "ttl": 14}),
+    "inf": (False, {"obs": 7}),
+    "explicit": (True, {"obs": 7}),
+}
+
+# phase timers collected by TILES (see tiles.alg.metrics: remove includes update_shared_coms)
+PHASES = ("ingest", "remove", "common_neighbors_analysis", "update_shared_coms", "snapshot", "write")
+
+
+def _peak_rss():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / 1024.0 if sys.platform != "darwin" else rss / 1024.0 / 1024.0
+
+
+def _scenario(mode, filename, path, phases, results):
+    explicit, params = MODES[mode]
+    sinks = [t.FileSink(path)]
+    if explicit:
+        tl = t.eTILES(sinks=sinks, **params)
+    else:
+        tl = t.TILES(sinks=sinks, **params)
+
+    records = 0
+    start = time.time()
+    for _ in tl.feed(read_edges(filename, columns=4 if explicit else 3)):
+        pass
+    tl.close()
+    elapsed = time.time() - start
+
+    with open(filename) as f:
+        for _ in f:
+            records += 1
+
+    writes = [r["timers"].get("write", 0.0) for r in tl.metrics.history]
+    result = {"records": records, "seconds": elapsed, "throughput": records / elapsed,
+              "slices": len(writes), "write_mean": sum(writes) / max(1, len(writes)),
+              "write_max": max(writes) if writes else 0.0, "peak_rss_mb": _peak_rss(),
+              "nodes": tl.g.number_of_nodes(), "edges": tl.g.number_of_edges()}
+    if phases:
+        result["phases"] = tl.metrics.totals()["timers"]
+    results.put(result)
+
+
+def run_scenario(mode, scale, workdir, phases=False, seed=0):
+    """
+        Run a single scenario in a separate process
+        :param mode: algorithm variant (see MODES)
+        :param scale: stream size (see SCALES)
+        :param workdir: folder for the stream and the outputs
+        :param phases: also report the time spent in each algorithm phase
+        :param seed: stream generator seed
+        :return: dictionary of measures
+    """
+    explicit, _ = MODES[mode]
+    filename = os.path.join(workdir, "%s-%s-%d.tsv" % ("explicit" if explicit else "stream", scale, seed))
+    if not os.path.exists(filename):
+        write_stream(generate(SCALES[scale], explicit=explicit, seed=seed), filename)
+
+    path = os.path.join(workdir, "out-%s-%s" % (mode, scale))
+    os.makedirs(path)
+
+    results = multiprocessing.Queue()
+    p = multiprocessing.Process(target=_scenario, args=(mode, filename, path, phases, results))
+    p.start()
+    result = results.get()
+    p.join()
+    shutil.rmtree(path)
+
+    result.update({"mode": mode, "scale": scale})
+    return result
+
+
+def report(results, baseline=None):
+    """
+        Print the results table, with the ratio against a baseline run if given
+    """
+    base = {}
+    if baseline is not None:
+        base = dict(((r["mode"], r["scale"]), r) for r in baseline)
+
+    header = "%-9s %-7s %10s %9s %12s %11s %11s %9s" % ("mode", "scale", "records", "seconds", "records/s",
+                                                          "write mean", "write max", "RSS (MB)")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = "%-9s %-7s %10d %9.2f %12.0f %10.3fs %10.3fs %9.1f" % (
+            r["mode"], r["scale"], r["records"], r["seconds"], r["throughput"], r["write_mean"], r["write_max"],
+            r["peak_rss_mb"] or 0)
+        old = base.get((r["mode"], r["scale"]))
+        if old is not None:
+            line += "   throughput x%.2f, RSS x%.2f" % (r["throughput"] / old["throughput"],
+                                                       (r["peak_rss_mb"] or 1) / (old["peak_rss_mb"] or 1))
+        print(line)
+        if "phases" in r:
+            print("          " + ", ".join("%s %.2fs" % (p, r["phases"][p]) for p in PHASES
+                                            if p in r["phases"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument('--scales', nargs='+', default=["small"], choices=sorted(SCALES))
+    parser.add_argument('--modes', nargs='+', default=["ttl", "explicit"], choices=sorted(MODES))
+    parser.add_argument('--phases', action='store_true', help='report the time spent in each phase')
+    parser.add_argument('--seed', type=int, default=0, help='stream generator seed')
+    parser.add_argument('--save', type=str, help='save the results as JSON')
+    parser.add_argument('--baseline', type=str, help='JSON results of a previous run to compare with')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="tiles-bench-")
+    try:
+        results = [run_scenario(mode, scale, workdir, args.phases, args.seed)
+                   for scale in args.scales for mode in args.modes]
+    finally:
+        shutil.rmtree(workdir)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
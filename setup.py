@@ -40,6 +40,8 @@ setup(name='tiles',
           'Programming Language :: Python :: 3'
       ],
       keywords=['complex-networks', 'dynamic community discovery', 'dynamic networks'],
-      install_requires=['networkx',  'future', ''],
-      packages=find_packages(exclude=["*.test", "*.test.*", "test.*", "test", "tiles.test", "tiles.test.*"]),
+      install_requires=['future'],
+      extras_require={'networkx': ['networkx'], 'fast': ['numpy']},
+      packages=find_packages(exclude=["*.test", "*.test.*", "test.*", "test", "tiles.test", "tiles.test.*",
+                                      "benchmarks", "benchmarks.*"]),
       )
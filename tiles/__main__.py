@@ -1,5 +1,14 @@
 from tiles.alg.TILES import TILES
 from tiles.alg.eTILES import eTILES
+from tiles.alg.sinks import FileSink, ThreadedSink
+from tiles.alg.delta import DeltaSink
+from tiles.alg.columnar import ColumnarSink
+from tiles.alg.events import EventLog
+from tiles.alg.approx import Approximation
+from tiles.alg.history import HistorySink
+from tiles.alg.sweep import sweep, grid
+from tiles.alg.tenants import run_tenants
+import os
 import sys
 import argparse
 
@@ -20,20 +29,117 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
 
-    parser.add_argument('filename', type=str, help='filename')
-    parser.add_argument('-o', '--obs', type=int, help='observation (days)', default=7)
+    parser.add_argument('filename', type=str,
+                        help='filename ("-": standard input), or tcp://host:port / unix:path to run as a service')
+    parser.add_argument('-o', '--obs', type=int, nargs='+', help='observation (days)', default=[7])
     parser.add_argument('-p', '--path', type=str, help='path', default="")
-    parser.add_argument('-t', '--ttl', type=int, help='Edge Time To Leave (optional)', default=float('inf'))
+    parser.add_argument('-t', '--ttl', type=int, nargs='+', help='Edge Time To Leave (optional)',
+                        default=[float('inf')])
     parser.add_argument('-m', '--mode', type=str, help='TTL or Explicit', default="TTL")
+    parser.add_argument('-b', '--background', action='store_true',
+                        help='write the observations on a background thread')
+    parser.add_argument('-d', '--delta', type=int, default=0,
+                        help='write only the differences between observations, '
+                             'with a full keyframe every DELTA observations (optional)')
+    parser.add_argument('--npy', action='store_true',
+                        help='write the observations as binary columnar .npy arrays (optional)')
+    parser.add_argument('--codec', type=str, default='gzip', choices=['gzip', 'bz2', 'xz', 'none'],
+                        help='compression of the output files (default: gzip)')
+    parser.add_argument('--level', type=int,
+                        help='compression level (default: 3 for gzip, 9 for bz2, 6 for xz)')
+    parser.add_argument('--compress-threads', type=int, default=1,
+                        help='threads compressing the output files concurrently, in parallel blocks (default: 1)')
+    parser.add_argument('--history', action='store_true',
+                        help='index the node/community history in history.db (optional)')
+    parser.add_argument('-e', '--events', action='store_true',
+                        help='log the community lifecycle events in events.jsonl (optional)')
+    parser.add_argument('-c', '--checkpoint', type=str,
+                        help='save the algorithm state periodically in CHECKPOINT (optional)')
+    parser.add_argument('--checkpoint-interval', type=int, default=600,
+                        help='seconds between two checkpoints (default: 600)')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue from the last checkpoint (requires --checkpoint)')
+
+    parser.add_argument('--batch', type=int, nargs='?', const=0, metavar='WINDOW',
+                        help='coalesce the repeated interactions of the same timestamp (or of WINDOW seconds) '
+                             'in a single update (optional, TTL mode)')
+    parser.add_argument('--gc', action='store_true',
+                        help='drop the nodes left isolated by edge removals (optional)')
+    parser.add_argument('--approx', type=int, nargs=2, metavar=('NEIGHBORS', 'BUDGET'),
+                        help='approximate mode: the community propagation of an interaction examines at most '
+                             'NEIGHBORS (sampled) common neighbors and BUDGET community checks (optional)')
+    parser.add_argument('-j', '--processes', type=int,
+                        help='worker processes of a parameter sweep or of --tenants (default: number of cores)')
+    parser.add_argument('--tenants', action='store_true',
+                        help='the first column is a tenant key: run an independent instance per tenant, '
+                             'writing in path/<tenant> (optional)')
 
     args = parser.parse_args()
 
-    if args.mode == 'TTL':
-        an = TILES(filename=args.filename, obs=args.obs, path=args.path, ttl=args.ttl)
-        an.execute()
-    elif args.mode == 'Explicit':
-        an = eTILES(filename=args.filename, obs=args.obs, path=args.path)
-        an.execute()
+    if args.tenants:
+        params = {"obs": args.obs[0], "gc": args.gc}
+        if args.mode == 'TTL':
+            params["ttl"] = args.ttl[0]
+        summary = run_tenants(args.filename, args.path, args.mode == 'Explicit', args.processes, args.batch,
+                              **params)
+        for tenant in sorted(summary):
+            sys.stdout.write("%s: %d slices, %d interactions\n" % (tenant, summary[tenant]["slices"],
+                                                                  summary[tenant]["interactions"]))
+        sys.exit(0)
+
+    # several obs/ttl values: parameter sweep, the input is parsed once and shared by the workers
+    configs = grid(args.ttl if args.mode == 'TTL' else [float('inf')], args.obs)
+    if len(configs) > 1 and args.mode in ('TTL', 'Explicit'):
+        if args.npy or args.delta > 0 or args.history or args.checkpoint is not None or args.resume:
+            parser.error("--npy, -d, --history, -c and --resume are not supported by parameter sweeps")
+        params = {"gc": args.gc, "codec": args.codec, "level": args.level, "compress_threads": args.compress_threads,
+                  "approx": Approximation(*args.approx) if args.approx else None}
+        for run in sweep(args.filename, configs, args.path, args.mode == 'Explicit', args.processes, args.batch,
+                         args.background, args.events, **params):
+            sys.stdout.write("%s: %d slices (%.1fs)\n" % (run["path"], run["slices"], run["seconds"]))
+        sys.exit(0)
+    args.obs = args.obs[0]
+    args.ttl = args.ttl[0]
+
+    if args.npy:
+        sinks = [ColumnarSink(args.path)]
+    elif args.delta > 0:
+        sinks = [DeltaSink(args.path, keyframe=args.delta)]
+    else:
+        sinks = [FileSink(args.path, codec=args.codec, level=args.level, threads=args.compress_threads)]
+    if args.history:
+        sinks.append(HistorySink(os.path.join(args.path, "history.db")))
+    if args.background:
+        sinks = [ThreadedSink(sink) for sink in sinks]
+
+    events = EventLog(os.path.join(args.path, "events.jsonl")) if args.events else None
+    approx = Approximation(*args.approx) if args.approx else None
+
+    if args.resume and args.checkpoint is None:
+        parser.error("--resume requires --checkpoint")
+
+    if args.resume and os.path.exists(args.checkpoint):
+        # parameters and sinks are the ones of the interrupted run
+        an = TILES.load_checkpoint(args.checkpoint)
+        sys.stdout.write("Resuming from byte %d of %s\n" % (an.offset, an.filename))
+        an.execute(args.checkpoint, args.checkpoint_interval, args.batch)
+    elif args.mode in ('TTL', 'Explicit'):
+        if args.mode == 'TTL':
+            an = TILES(filename=args.filename, obs=args.obs, path=args.path, ttl=args.ttl, sinks=sinks, gc=args.gc,
+                       events=events, approx=approx)
+        else:
+            an = eTILES(filename=args.filename, obs=args.obs, path=args.path, sinks=sinks, gc=args.gc,
+                        events=events, approx=approx)
+
+        if args.filename.startswith(('tcp://', 'unix:')):
+            # live ingestion service (python 3)
+            from tiles.alg.service import serve
+            an.metrics.filename = os.path.join(args.path, "metrics.jsonl")
+            sys.stdout.write("Listening on %s\n" % args.filename)
+            sys.stdout.flush()
+            serve(an, args.filename, window=args.batch)
+        else:
+            an.execute(args.checkpoint, args.checkpoint_interval, args.batch)
     else:
         sys.stdout.write("Unsupported mode\n")
         sys.stdout.flush()
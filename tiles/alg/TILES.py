@@ -2,20 +2,19 @@
     Created on 11/feb/2015
     @author: Giulio Rossetti
 """
-import networkx as nx
-import gzip
-import datetime
-import time
+import math
 from future.utils import iteritems
+import gzip
 import os
-
-import sys
-if sys.version_info > (2, 7):
-    from io import StringIO
-    from queue import PriorityQueue
-else:
-    from cStringIO import StringIO
-    from Queue import PriorityQueue
+import pickle
+import time
+from .graph import as_graph
+from .expiry import ExpiryWheel, DAY
+from .reader import iter_chunks, to_records, CHUNK_SIZE
+from .snapshot import Snapshot
+from .sinks import FileSink
+from .metrics import Metrics, clock
+from .memberships import Memberships
 
 
 __author__ = "Giulio Rossetti"
@@ -23,6 +22,19 @@ __contact__ = "giulio.rossetti@gmail.com"
 __website__ = "about.giuliorossetti.net"
 __license__ = "BSD"
 
+_MASK = (1 << 64) - 1
+
+
+def _node_hash(node):
+    """
+        64 bit mix of a node hash (splitmix64 finalizer): community fingerprints
+        are sums of these values, so they must be well spread
+    """
+    h = hash(node) & _MASK
+    h = ((h ^ (h >> 30)) * 0xbf58476d1ce4e5b9) & _MASK
+    h = ((h ^ (h >> 27)) * 0x94d049bb133111eb) & _MASK
+    return h ^ (h >> 31)
+
 
 class TILES(object):
     """
@@ -30,156 +42,298 @@ class TILES(object):
         Algorithm for evolutionary community discovery
     """
 
-    def __init__(self, filename=None, g=None, ttl=float('inf'), obs=7, path="", start=None, end=None):
+    # fields of an input record
+    columns = 3
+    # bytes read at a time by execute() (checkpoints are taken between two chunks)
+    chunk_size = CHUNK_SIZE
+
+    def __init__(self, filename=None, g=None, ttl=float('inf'), obs=7, path="", start=None, end=None,
+                 sinks=None, metrics=None, gc=False, codec="gzip", level=None, compress_threads=1,
+                 events=None, approx=None):
         """
             Constructor
-            :param g: networkx graph
+            :param g: graph backend (default: CompactGraph) or networkx graph
             :param ttl: edge time to live (days)
             :param obs: observation window (days)
             :param path: Path where generate the results and find the edge file
             :param start: starting date
             :param end: ending date
+            :param sinks: list of snapshot sinks (execute() defaults to a FileSink on path)
+            :param metrics: Metrics collecting the operational measures (execute() defaults to metrics.jsonl on path)
+            :param gc: drop the nodes left without edges and communities by a removal, so that memory follows
+                       the active graph (the node enumeration order, and thus the output, may change)
+            :param codec: compression of the default FileSink output files (gzip, bz2, xz or none)
+            :param level: compression level (default: codec dependent, see FileSink)
+            :param compress_threads: compression threads of the default FileSink
+            :param events: EventLog receiving the community lifecycle events (optional)
+            :param approx: Approximation capping the community propagation work of an interaction on hub-dominated
+                           streams (optional, the communities are approximate; graph upkeep and split detection
+                           are exact and not capped)
         """
         self.path = path
         self.ttl = ttl
         self.cid = 0
         self.actual_slice = 0
-        if g is None:
-            self.g = nx.Graph()
-        else:
-            self.g = g
-        self.splits = None
-        self.spl = StringIO()
+        self.g = as_graph(g)
+        self.splits = []
         self.base = os.getcwd()
-        self.status = open("%s/%s/extraction_status.txt" % (self.base, path), "w")
         self.removed = 0
         self.added = 0
         self.filename = filename
         self.start = start
         self.end = end
         self.obs = obs
-        self.communities = {}
-
-    def execute(self):
+        # node <-> community index; communities: community id -> {node: None}
+        self.memberships = Memberships()
+        self.communities = self.memberships.members
+        # order independent hash of the members of each community (sum of the node hashes)
+        self.fingerprints = {}
+        self.sinks = list(sinks) if sinks is not None else []
+        self.qr = ExpiryWheel(ttl)
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.events = events
+        self.approx = approx
+        self.gc = gc
+        self.codec = codec
+        self.level = level
+        self.compress_threads = compress_threads
+
+        # a new observation starts once obs whole days are elapsed
+        self.span = int(math.ceil(obs)) * DAY
+        self.actual_time = None
+        self.last_break = None
+        self.last_time = None
+        # bytes of the input file already processed
+        self.offset = 0
+
+    def execute(self, checkpoint=None, interval=600, window=None):
         """
             Execute TILES algorithm
+            :param checkpoint: checkpoint filename (optional): the algorithm state is saved every interval seconds
+                               and removed once the execution is completed
+            :param interval: seconds between two checkpoints
+            :param window: micro-batch window in seconds (optional, see feed)
         """
-        self.status.write(u"Started! (%s) \n\n" % str(time.asctime(time.localtime(time.time()))))
-        self.status.flush()
-
-        qr = PriorityQueue()
-
-        with open(self.filename, 'r') as f:
-            first_line = f.readline()
-
-        actual_time = datetime.datetime.fromtimestamp(float(first_line.split("\t")[2]))
-        last_break = actual_time
-        f.close()
-
-        count = 0
+        if not self.sinks:
+            self.sinks.append(FileSink(self.path, self.base, self.codec, self.level, self.compress_threads))
+        if self.metrics.filename is None:
+            self.metrics.filename = os.path.join(self.base, self.path, "metrics.jsonl")
+
+        last = time.time()
+        for offset, chunk in iter_chunks(self.filename, self.columns, self.chunk_size, self.offset):
+            for snapshot in self.feed(to_records(chunk), window):
+                print("New slice. Starting Day: %s" % snapshot.end_date)
+            self.offset = offset
+
+            if checkpoint is not None and time.time() - last >= interval:
+                self.save_checkpoint(checkpoint)
+                last = time.time()
+
+        self.close()
+        if checkpoint is not None and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+    def save_checkpoint(self, filename):
+        """
+            Save the full algorithm state (graph, communities, expiration queue, pending splits, sinks,
+            metrics and input offset). The file is replaced atomically.
+            :param filename: checkpoint filename
+        """
+        tmp = "%s.tmp" % filename
+        with gzip.open(tmp, "wb", 1) as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+        # os.replace is atomic also on Windows (python 3), os.rename on POSIX
+        getattr(os, "replace", os.rename)(tmp, filename)
+
+    @staticmethod
+    def load_checkpoint(filename):
+        """
+            Restore an algorithm state saved by save_checkpoint: execute() continues from the saved input offset
+            :param filename: checkpoint filename
+            :return: the TILES (or eTILES) instance
+        """
+        with gzip.open(filename, "rb") as f:
+            return pickle.load(f)
 
-        #################################################
-        #                   Main Cycle                  #
-        #################################################
+    def feed(self, edges, window=None):
+        """
+            Process a stream of interactions
+            :param edges: iterable of (u, v, timestamp) records, timestamps in epoch seconds
+            :param window: None to process the interactions one at a time, otherwise the interactions falling
+                           within window seconds (0: same timestamp) are processed as a batch (see process_batch)
+            :return: generator of the Snapshots of the completed observations
+        """
+        if window is None:
+            for u, v, t in edges:
+                snapshot = self.process_edge(u, v, t)
+                if snapshot is not None:
+                    yield snapshot
+            return
 
-        f = open(self.filename)
-        for l in f:
-            l = l.split("\t")
-            self.added += 1
-            e = {}
-            u = int(l[0])
-            v = int(l[1])
-            dt = datetime.datetime.fromtimestamp(float(l[2]))
+        batch = []
+        limit = None
+        for edge in edges:
+            t = edge[2]
+            if batch and t > limit:
+                snapshot = self.process_batch(batch) if len(batch) > 1 else self.process_edge(*batch[0])
+                if snapshot is not None:
+                    yield snapshot
+                batch = []
+
+            if not batch:
+                # a batch never spans two observations
+                if self.last_break is None or t - self.last_break >= self.span:
+                    limit = min(t + window, t + self.span - 1)
+                else:
+                    limit = min(t + window, self.last_break + self.span - 1)
+            batch.append(edge)
 
-            e['weight'] = 1
-            e["u"] = l[0]
-            e["v"] = l[1]
-            # month = dt.month
+        if batch:
+            snapshot = self.process_batch(batch) if len(batch) > 1 else self.process_edge(*batch[0])
+            if snapshot is not None:
+                yield snapshot
 
-            #############################################
-            #               Observations                #
-            #############################################
+    def process_edge(self, u, v, t):
+        """
+            Process a single interaction
+            :param u: a node
+            :param v: a node
+            :param t: timestamp (epoch seconds)
+            :return: the Snapshot of the observation completed by the interaction, None otherwise
+        """
+        snapshot = self.observe(t)
 
-            gap = dt - last_break
-            dif = gap.days
+        start = clock()
+        self.add_interaction(u, v, t)
+        self.metrics.add_time("ingest", clock() - start)
+        return snapshot
 
-            if dif >= self.obs:
-                last_break = dt
-                self.added -= 1
+    def add_interaction(self, u, v, t):
+        """
+            Update the graph and the communities with an interaction
+            :param u: a node
+            :param v: a node
+            :param t: timestamp (epoch seconds)
+        """
+        if u == v:
+            return
 
-                print("New slice. Starting Day: %s" % dt)
+        # Check if edge removal is required
+        if self.ttl != float('inf'):
+            self.qr.push(t, u, v)
+            self.remove(t, self.qr)
 
-                self.status.write(u"Saving Slice %s: Starting %s ending %s - (%s)\n" %
-                                  (self.actual_slice, actual_time, dt,
-                                   str(time.asctime(time.localtime(time.time())))))
+        if self.g.has_edge(u, v):
+            w = self.g.weight(u, v)
+            self.g.set_weight(u, v, w + 1)
+            return
+        else:
+            common_neighbors = self.g.add_edge(u, v, 1)
+            self.metrics.incr("new_edges")
 
-                self.status.write(u"Edge Added: %d\tEdge removed: %d\n" % (self.added, self.removed))
-                self.added = 1
-                self.removed = 0
+        #############################################
+        #               Evolution                   #
+        #############################################
 
-                actual_time = dt
-                self.status.flush()
+        # new community of peripheral nodes (new nodes)
+        if self.g.degree(u) > 1 and self.g.degree(v) > 1:
+            start = clock()
+            self.common_neighbors_analysis(u, v, common_neighbors)
+            self.metrics.add_time("common_neighbors_analysis", clock() - start)
 
-                self.splits = gzip.open("%s/%s/splitting-%d.gz" % (self.base, self.path, self.actual_slice), "wt", 3)
-                self.splits.write(self.spl.getvalue())
-                self.splits.flush()
-                self.splits.close()
-                self.spl = StringIO()
+    def process_batch(self, edges):
+        """
+            Process a group of interactions as a single update: the occurrences of the same pair are coalesced
+            in one weight increment and one expiration record, and the evolution step only runs for the new edges.
+            Equivalent to process_edge on each interaction when they share the same timestamp; otherwise they are
+            accounted to the observation of the first one and expire as if they happened at the last timestamp.
+            :param edges: non empty list of (u, v, timestamp) records, in stream order
+            :return: the Snapshot of the observation completed by the batch, None otherwise
+        """
+        t = edges[-1][2]
+        snapshot = self.observe(edges[0][2], len(edges))
+        self.last_time = t
 
-                self.print_communities()
-                self.status.write(
-                    u"\nStarted Slice %s (%s)\n" % (self.actual_slice, str(datetime.datetime.now().time())))
+        start = clock()
 
+        # occurrences of each pair, orientation of the first one (insertion) and of the last one (expiration)
+        counts = {}
+        first = []
+        last = {}
+        for i, (u, v, _) in enumerate(edges):
             if u == v:
                 continue
-
-            # Check if edge removal is required
-            if self.ttl != float('inf'):
-                qr.put((dt, (int(e['u']), int(e['v']), int(e['weight']))))
-                self.remove(dt, qr)
-
-            if not self.g.has_node(u):
-                self.g.add_node(u)
-                self.g.nodes[u]['c_coms'] = {}  # central
-
-            if not self.g.has_node(v):
-                self.g.add_node(v)
-                self.g.nodes[v]['c_coms'] = {}
-
+            key = (u, v) if u <= v else (v, u)
+            if key in counts:
+                counts[key] += 1
+            else:
+                counts[key] = 1
+                first.append((u, v, key))
+            last[key] = (i, u, v, key)
+
+        if first and self.ttl != float('inf'):
+            queue = sorted(last.values())
+            # as in process_edge, the first interaction is queued before the expired ones are removed
+            if counts[first[0][2]] == 1:
+                _, u, v, _ = queue.pop(0)
+                self.qr.push(t, u, v)
+            self.remove(t, self.qr)
+            for _, u, v, key in queue:
+                self.qr.push(t, u, v, counts[key])
+
+        for u, v, key in first:
             if self.g.has_edge(u, v):
-                w = self.g.adj[u][v]["weight"]
-                self.g.adj[u][v]["weight"] = w + e['weight']
+                self.g.set_weight(u, v, self.g.weight(u, v) + counts[key])
                 continue
-            else:
-                self.g.add_edge(u, v)
-                self.g.adj[u][v]["weight"] = e['weight']
 
-            u_n = list(self.g.neighbors(u))
-            v_n = list(self.g.neighbors(v))
+            common_neighbors = self.g.add_edge(u, v, counts[key])
+            self.metrics.incr("new_edges")
+            if self.g.degree(u) > 1 and self.g.degree(v) > 1:
+                cna = clock()
+                self.common_neighbors_analysis(u, v, common_neighbors)
+                self.metrics.add_time("common_neighbors_analysis", clock() - cna)
 
-            #############################################
-            #               Evolution                   #
-            #############################################
+        self.metrics.incr("coalesced", len(edges) - len(first))
+        self.metrics.add_time("ingest", clock() - start)
+        return snapshot
 
-            # new community of peripheral nodes (new nodes)
-            if len(u_n) > 1 and len(v_n) > 1:
-                common_neighbors = set(u_n) & set(v_n)
-                self.common_neighbors_analysis(u, v, common_neighbors)
+    def observe(self, t, count=1):
+        """
+            Account new interactions and close the actual observation if needed
+            :param t: timestamp of the interactions (epoch seconds)
+            :param count: number of interactions
+            :return: the Snapshot of the completed observation, None otherwise
+        """
+        snapshot = None
 
-            count += 1
+        if self.last_break is None:
+            self.actual_time = self.last_break = t
 
-        #  Last writing
-        self.status.write(u"Slice %s: Starting %s ending %s - (%s)\n" %
-                          (self.actual_slice, actual_time, actual_time,
-                           str(time.asctime(time.localtime(time.time())))))
-        self.status.write(u"Edge Added: %d\tEdge removed: %d\n" % (self.added, self.removed))
-        self.added = 0
-        self.removed = 0
+        #############################################
+        #               Observations                #
+        #############################################
+
+        if t - self.last_break >= self.span:
+            self.last_break = t
+            snapshot = self.snapshot(t)
+            self.actual_time = t
 
-        self.print_communities()
-        self.status.write(u"Finished! (%s)" % str(time.asctime(time.localtime(time.time()))))
-        self.status.flush()
-        self.status.close()
+        self.added += count
+        self.metrics.incr("interactions", count)
+        self.last_time = t
+        return snapshot
+
+    def close(self):
+        """
+            Close the last (partial) observation and the sinks
+            :return: the Snapshot of the last observation
+        """
+        snapshot = self.snapshot(self.last_time, final=True)
+        for sink in self.sinks:
+            sink.close()
+        if self.events is not None:
+            self.events.close()
+        return snapshot
 
     @property
     def new_community_id(self):
@@ -188,92 +342,93 @@ class TILES(object):
             :return: new community id
         """
         self.cid += 1
+        self.metrics.incr("new_communities")
         self.communities[self.cid] = {}
+        self.fingerprints[self.cid] = 0
+        if self.events is not None:
+            self.events.emit("birth", self.last_time, self.actual_slice, self.cid)
         return self.cid
 
     def remove(self, actual_time, qr):
         """
             Edge removal procedure
-            :param actual_time: timestamp of the last inserted edge
-            :param qr: Priority Queue containing the edges to be removed ordered by their timestamps
+            :param actual_time: timestamp of the last inserted edge (epoch seconds)
+            :param qr: ExpiryWheel containing the interactions to be removed ordered by their timestamps
         """
-
+        start = clock()
         coms_to_change = {}
-        at = actual_time
-
-        # main cycle on the removal queue
-        if not qr.empty():
 
-            t = qr.get()
-            timestamp = t[0]
-            e = (t[1][0],  t[1][1], t[1][2])
+        # main cycle on the expired interactions
+        for u, v, count in qr.expired(actual_time):
 
-            delta = at - timestamp
-            displacement = delta.days
-
-            if displacement < self.ttl:
-                qr.put((timestamp, t[1]))
-
-            else:
-                while self.ttl <= displacement:
-
-                    self.removed += 1
-                    u = int(e[0])
-                    v = int(e[1])
-                    if self.g.has_edge(u, v):
+            self.removed += count
+            self.metrics.incr("removals", count)
+            if self.g.has_edge(u, v):
 
-                        w = self.g.adj[u][v]["weight"]
+                w = self.g.weight(u, v)
 
-                        # decreasing link weight if greater than one
-                        # (multiple occurrence of the edge: remove only the oldest)
-                        if w > 1:
-                            self.g.adj[u][v]["weight"] = w - 1
-                            e = (u,  v, w-1)
-                            qr.put((at, e))
+                # decreasing link weight if greater than one
+                # (multiple occurrence of the edge: remove only the oldest)
+                if w > count:
+                    self.g.set_weight(u, v, w - count)
+                    qr.push(actual_time, u, v, count)
 
-                        else:
-                            # u and v shared communities
-                            if len(list(self.g.neighbors(u))) > 1 and len(list(self.g.neighbors(v))) > 1:
-                                coms = set(self.g.nodes[u]['c_coms'].keys()) & set(self.g.nodes[v]['c_coms'].keys())
-
-                                for c in coms:
-                                    if c not in coms_to_change:
-                                        cn = set(self.g.neighbors(u)) & set(self.g.neighbors(v))
-                                        coms_to_change[c] = [u, v]
-                                        coms_to_change[c].extend(list(cn))
-                                    else:
-                                        cn = set(self.g.neighbors(u)) & set(self.g.neighbors(v))
-                                        coms_to_change[c].extend(list(cn))
-                                        coms_to_change[c].extend([u, v])
-                                        ctc = set(coms_to_change[c])
-                                        coms_to_change[c] = list(ctc)
+                else:
+                    # the first w - 1 occurrences decrease the weight, the w-th removes the edge
+                    if w > 1:
+                        qr.push(actual_time, u, v, w - 1)
+
+                    # u and v shared communities
+                    if self.g.degree(u) > 1 and self.g.degree(v) > 1:
+                        coms = set(self.memberships.communities(u)) & set(self.memberships.communities(v))
+                        cn = self.g.common_neighbors(u, v) if coms else []
+                        if self.approx is not None:
+                            cn = self.approx.sample(cn)
+
+                        for c in coms:
+                            if c not in coms_to_change:
+                                coms_to_change[c] = [u, v]
+                                coms_to_change[c].extend(cn)
                             else:
-                                if len(list(self.g.neighbors(u))) < 2:
-                                    coms_u = [x for x in self.g.nodes[u]['c_coms'].keys()]
-                                    for cid in coms_u:
-                                        self.remove_from_community(u, cid)
-
-                                if len(list(self.g.neighbors(v))) < 2:
-                                    coms_v = [x for x in self.g.nodes[v]['c_coms'].keys()]
-                                    for cid in coms_v:
-                                        self.remove_from_community(v, cid)
-
-                            self.g.remove_edge(u, v)
-
-                    if not qr.empty():
-
-                        t = qr.get()
+                                coms_to_change[c].extend(cn)
+                                coms_to_change[c].extend([u, v])
+                                ctc = set(coms_to_change[c])
+                                coms_to_change[c] = list(ctc)
+                    else:
+                        if self.g.degree(u) < 2:
+                            coms_u = list(self.memberships.communities(u))
+                            for cid in coms_u:
+                                self.remove_from_community(u, cid)
 
-                        timestamp = t[0]
-                        delta = at - timestamp
-                        displacement = delta.days
+                        if self.g.degree(v) < 2:
+                            coms_v = list(self.memberships.communities(v))
+                            for cid in coms_v:
+                                self.remove_from_community(v, cid)
 
-                        e = t[1]
+                    self.g.remove_edge(u, v)
+                    self.metrics.incr("removed_edges")
+                    if self.gc:
+                        self.collect(u, v)
 
         # update of shared communities
         self.update_shared_coms(coms_to_change)
+        self.metrics.add_time("remove", clock() - start)
+
+    def collect(self, u, v):
+        """
+            Drop the endpoints of a removed edge left isolated.
+            A node losing its last edge falls in the low degree case of the removal, which already dropped
+            its memberships: the node cannot be referenced by a community anymore.
+            :param u: a node
+            :param v: a node
+        """
+        for n in (u, v):
+            if self.g.degree(n) == 0 and not self.memberships.communities(n):
+                self.g.remove_node(n)
+                self.metrics.incr("collected_nodes")
 
     def update_shared_coms(self, coms_to_change):
+        start = clock()
         # update of shared communities
         for c in coms_to_change:
             if c not in self.communities:
@@ -283,12 +438,11 @@ class TILES(object):
 
             if len(c_nodes) > 3:
 
-                sub_c = self.g.subgraph(c_nodes)
-                c_components = nx.number_connected_components(sub_c)
+                components = list(self.g.connected_components(c_nodes))
 
                 # unbroken community
-                if c_components == 1:
-                    to_mod = sub_c.subgraph(coms_to_change[c])
+                if len(components) == 1:
+                    to_mod = self.g.subgraph_nodes(n for n in coms_to_change[c] if n in components[0])
                     self.modify_after_removal(to_mod, c)
 
                 # broken community: bigger one maintains the id, the others obtain a new one
@@ -296,46 +450,48 @@ class TILES(object):
                     new_ids = []
 
                     first = True
-                    components = nx.connected_components(sub_c)
                     for com in components:
                         if first:
                             if len(com) < 3:
                                 self.destroy_community(c)
                             else:
-                                to_mod = list(set(com) & set(coms_to_change[c]))
-                                sub_c = self.g.subgraph(to_mod)
-                                self.modify_after_removal(sub_c, c)
+                                to_mod = self.g.subgraph_nodes(list(set(com) & set(coms_to_change[c])))
+                                self.modify_after_removal(to_mod, c)
                             first = False
 
                         else:
                             if len(com) > 3:
                                 # update the memberships: remove the old ones and add the new one
-                                to_mod = list(set(com) & set(coms_to_change[c]))
-                                sub_c = self.g.subgraph(to_mod)
+                                to_mod = self.g.subgraph_nodes(list(set(com) & set(coms_to_change[c])))
 
-                                central = self.centrality_test(sub_c).keys()
+                                central = self.centrality_test(to_mod).keys()
                                 if len(central) >= 3:
                                     actual_id = self.new_community_id
                                     new_ids.append(actual_id)
                                     for n in central:
                                         self.add_to_community(n, actual_id)
 
+                    if new_ids and self.events is not None:
+                        self.events.emit("split", self.last_time, self.actual_slice, c, communities=new_ids)
+
                     # splits
                     if len(new_ids) > 0 and self.actual_slice > 0:
-                        self.spl.write(u"%s\t%s\n" % (c, str(new_ids)))
+                        self.splits.append((c, new_ids))
+                        self.metrics.incr("splits")
             else:
                 self.destroy_community(c)
+        self.metrics.add_time("update_shared_coms", clock() - start)
 
     def modify_after_removal(self, sub_c, c):
         """
             Maintain the clustering coefficient invariant after the edge removal phase
-            :param sub_c: sub-community to evaluate
+            :param sub_c: nodes of the sub-community to evaluate
             :param c: community id
         """
         central = self.centrality_test(sub_c).keys()
 
         # in case of previous splits, update for the actual nodes
-        remove_node = set(self.communities[c].keys()) - set(sub_c.nodes())
+        remove_node = set(self.communities[c].keys()) - set(sub_c)
 
         for rm in remove_node:
             self.remove_from_community(rm, c)
@@ -343,7 +499,7 @@ class TILES(object):
         if len(central) < 3:
             self.destroy_community(c)
         else:
-            not_central = set(sub_c.nodes()) - set(central)
+            not_central = set(sub_c) - set(central)
             for n in not_central:
                 self.remove_from_community(n, c)
 
@@ -361,15 +517,34 @@ class TILES(object):
 
         else:
 
-            shared_coms = set(self.g.nodes[v]['c_coms'].keys()) & set(self.g.nodes[u]['c_coms'].keys())
-            only_u = set(self.g.nodes[u]['c_coms'].keys()) - set(self.g.nodes[v]['c_coms'].keys())
-            only_v = set(self.g.nodes[v]['c_coms'].keys()) - set(self.g.nodes[u]['c_coms'].keys())
+            coms_u = set(self.memberships.communities(u))
+            coms_v = set(self.memberships.communities(v))
+            shared_coms = coms_v & coms_u
+            only_u = coms_u - coms_v
+            only_v = coms_v - coms_u
+
+            # approximate mode: bounded number of neighbors and of community checks
+            budget = None
+            if self.approx is not None:
+                sampled = self.approx.sample(common_neighbors)
+                if len(sampled) < len(common_neighbors):
+                    self.metrics.incr("sampled_edges")
+                    common_neighbors = sampled
+                budget = self.approx.budget
 
             # community propagation: a community is propagated iff at least two of [u, v, z] are central
             propagated = False
+            exhausted = False
 
             for z in common_neighbors:
-                for c in self.g.nodes[z]['c_coms'].keys():
+                if budget is not None:
+                    budget -= 1 + len(self.memberships.communities(z)) + len(shared_coms)
+                    if budget < 0:
+                        self.metrics.incr("exhausted_budgets")
+                        exhausted = True
+                        break
+
+                for c in self.memberships.communities(z):
                     if c in only_v:
                         self.add_to_community(u, c)
                         propagated = True
@@ -379,160 +554,145 @@ class TILES(object):
                         propagated = True
 
                 for c in shared_coms:
-                    if c not in self.g.nodes[z]['c_coms']:
+                    if c not in self.memberships.communities(z):
                         self.add_to_community(z, c)
                         propagated = True
 
-            else:
-                if not propagated:
-                    # new community
-                    actual_cid = self.new_community_id
-                    self.add_to_community(u, actual_cid)
-                    self.add_to_community(v, actual_cid)
+            # a cut propagation may have missed a community of u or v: do not duplicate it
+            if not propagated and not (exhausted and (coms_u or coms_v)):
+                # new community
+                actual_cid = self.new_community_id
+                self.add_to_community(u, actual_cid)
+                self.add_to_community(v, actual_cid)
 
-                    for z in common_neighbors:
-                        self.add_to_community(z, actual_cid)
+                for z in common_neighbors:
+                    self.add_to_community(z, actual_cid)
 
-    def print_communities(self):
+    def snapshot(self, t, final=False):
         """
-            Print the actual communities
+            Close the actual observation: detect merged communities and dispatch the Snapshot to the sinks
+            :param t: last timestamp of the observation (epoch seconds)
+            :param final: True for the last observation of the stream
+            :return: Snapshot
         """
-
-        out_file_coms = gzip.open("%s/%s/strong-communities-%d.gz" % (self.base, self.path, self.actual_slice), "wt", 3)
-        com_string = StringIO()
-
-        nodes_to_coms = {}
+        start = clock()
+        # (fingerprint, size) -> [lowest id, members] of the distinct communities sharing the fingerprint
+        buckets = {}
+        distinct = []
         merge = {}
         coms_to_remove = []
         drop_c = []
 
-        self.status.write(u"Writing Communities (%s)\n" % str(time.asctime(time.localtime(time.time()))))
-        self.status.flush()
         for idc, comk in iteritems(self.communities):
 
             com = comk.keys()
 
-            if self.communities[idc] is not None:
-                if len(com) > 2:
-                    key = tuple(sorted(com))
-
-                    # Collision check and merge index build (maintaining the lowest id)
-                    if key not in nodes_to_coms:
-                        nodes_to_coms[key] = idc
-                    else:
-                        old_id = nodes_to_coms[key]
-                        drop = idc
-                        if idc < old_id:
-                            drop = old_id
-                            nodes_to_coms[key] = idc
-
-                        # merged to remove
-                        coms_to_remove.append(drop)
-                        if not nodes_to_coms[key] in merge:
-                            merge[nodes_to_coms[key]] = [idc]
-                        else:
-                            merge[nodes_to_coms[key]].append(idc)
+            if len(com) > 2:
+                key = (self.fingerprints[idc], len(com))
+                bucket = buckets.setdefault(key, [])
+
+                # Collision check (full comparison only within the bucket)
+                entry = None
+                for candidate in bucket:
+                    if candidate[1] == com:
+                        entry = candidate
+                        break
+
+                # merge index build (maintaining the lowest id)
+                if entry is None:
+                    entry = [idc, com]
+                    bucket.append(entry)
+                    distinct.append(entry)
                 else:
-                    drop_c.append(idc)
+                    old_id = entry[0]
+                    drop = idc
+                    if idc < old_id:
+                        drop = old_id
+                        entry[0] = idc
+
+                    # merged to remove
+                    coms_to_remove.append(drop)
+                    if not entry[0] in merge:
+                        merge[entry[0]] = [idc]
+                    else:
+                        merge[entry[0]].append(idc)
             else:
                 drop_c.append(idc)
 
-        write_count = 0
-        for k, idk in iteritems(nodes_to_coms):
-            write_count += 1
-            if write_count % 50000 == 0:
-                out_file_coms.write(com_string.getvalue())
-                out_file_coms.flush()
-                com_string = StringIO()
-                write_count = 0
-            com_string.write(u"%d\t%s\n" % (idk, str(list(k))))
+        communities = {}
+        for idk, com in distinct:
+            communities[idk] = sorted(com)
 
         for dc in drop_c:
             self.destroy_community(dc)
 
-        out_file_coms.write(com_string.getvalue())
-        out_file_coms.flush()
-        out_file_coms.close()
-
-        # write the graph
-        self.status.write(u"Writing actual graph status (%s)\n" % str(time.asctime(time.localtime(time.time()))))
-        self.status.flush()
-        out_file_graph = gzip.open("%s/%s/graph-%d.gz" % (self.base, self.path, self.actual_slice), "wt", 3)
-        g_string = StringIO()
-        for e in self.g.edges():
-            g_string.write(u"%d\t%s\t%d\n" % (e[0], e[1], self.g.adj[e[0]][e[1]]['weight']))
-
-        out_file_graph.write(g_string.getvalue())
-        out_file_graph.flush()
-        out_file_graph.close()
-
-        # Write merge status
-        self.status.write(u"Writing merging file (%s)\n" % str(time.asctime(time.localtime(time.time()))))
-        self.status.flush()
-        out_file_merge = gzip.open("%s/%s/merging-%d.gz" % (self.base, self.path, self.actual_slice), "wt", 3)
-        m_string = StringIO()
+        merges = {}
         for comid, c_val in iteritems(merge):
             # maintain minimum community after merge
             c_val.append(comid)
             k = min(c_val)
             c_val.remove(k)
-            m_string.write(u"%d\t%s\n" % (k, str(c_val)))
-        out_file_merge.write(m_string.getvalue())
-        out_file_merge.flush()
-        out_file_merge.close()
+            merges[k] = c_val
+            if self.events is not None:
+                self.events.emit("merge", self.last_time, self.actual_slice, k, communities=c_val)
 
         # Community Cleaning
-        m = 0
         for c in coms_to_remove:
             self.destroy_community(c)
-            m += 1
-
-        self.status.write(u"Merged communities: %d (%s)\n" % (m, str(time.asctime(time.localtime(time.time())))))
 
+        snapshot = Snapshot(self.actual_slice, self.actual_time, t, communities, merges, self.splits,
+                            list(self.g.edges()), self.g.number_of_nodes(), self.added, self.removed, final)
+        self.metrics.incr("merged", len(coms_to_remove))
+        self.metrics.add_time("snapshot", clock() - start)
+
+        start = clock()
+        for sink in self.sinks:
+            sink.write(snapshot)
+        self.metrics.add_time("write", clock() - start)
+        if self.events is not None:
+            self.events.flush()
+
+        self.metrics.gauge("nodes", snapshot.nodes)
+        self.metrics.gauge("edges", len(snapshot.edges))
+        self.metrics.gauge("communities", len(communities))
+        self.metrics.gauge("queue", len(self.qr))
+        snapshot.metrics = self.metrics.record(self.actual_slice)
+
+        self.splits = []
+        self.added = 0
+        self.removed = 0
         self.actual_slice += 1
-        self.status.write(u"Total Communities %d (%s)\n" % (len(self.communities.keys()),
-                                                           str(time.asctime(time.localtime(time.time())))))
-        self.status.flush()
+        return snapshot
 
     def destroy_community(self, cid):
-        nodes = [x for x in self.communities[cid].keys()]
-        for n in nodes:
-            self.remove_from_community(n, cid)
-        self.communities.pop(cid, None)
+        if self.memberships.destroy(cid) is not None and self.events is not None:
+            self.events.emit("death", self.last_time, self.actual_slice, cid)
+        self.fingerprints.pop(cid, None)
 
     def add_to_community(self, node, cid):
-
-        self.g.nodes[node]['c_coms'][cid] = None
-        if cid in self.communities:
-            self.communities[cid][node] = None
-        else:
-            self.communities[cid] = {node: None}
+        created = cid not in self.communities
+        if self.memberships.add(node, cid):
+            h = _node_hash(node)
+            self.fingerprints[cid] = h if created else (self.fingerprints[cid] + h) & _MASK
+            if self.events is not None:
+                self.events.emit("growth", self.last_time, self.actual_slice, cid, node=node)
 
     def remove_from_community(self, node, cid):
-        if cid in self.g.nodes[node]['c_coms']:
-            self.g.nodes[node]['c_coms'].pop(cid, None)
-            if cid in self.communities and node in self.communities[cid]:
-                self.communities[cid].pop(node, None)
+        if self.memberships.remove(node, cid):
+            self.fingerprints[cid] = (self.fingerprints[cid] - _node_hash(node)) & _MASK
+            if self.events is not None:
+                self.events.emit("shrink", self.last_time, self.actual_slice, cid, node=node)
 
-    def centrality_test(self, subgraph):
+    def centrality_test(self, nodes):
+        """
+            Select the central nodes, i.e. the ones closing at least a triangle.
+            Triangle counts are maintained by the graph backend, so the test is O(1) per node.
+            :param nodes: nodes to evaluate
+            :return: dictionary having the central nodes as keys
+        """
         central = {}
 
-        for u in subgraph.nodes():
-            if u not in central:
-                cflag = False
-                neighbors_u = set(self.g.neighbors(u))
-                if len(neighbors_u) > 1:
-                    for v in neighbors_u:
-                        if u > v:
-                            if cflag:
-                                break
-                            else:
-                                neighbors_v = set(self.g.neighbors(v))
-                                cn = neighbors_v & neighbors_u
-                                if len(cn) > 0:
-                                    central[u] = None
-                                    central[v] = None
-                                    for n in cn:
-                                        central[n] = None
-                                    cflag = True
+        for u in nodes:
+            if self.g.triangles(u) > 0:
+                central[u] = None
         return central
@@ -1,2 +1,13 @@
 from .TILES import TILES
-from .eTILES import eTILES
\ No newline at end of file
+from .eTILES import eTILES
+from .graph import CompactGraph, NetworkXGraph
+from .snapshot import Snapshot
+from .metrics import Metrics
+from .approx import Approximation
+from .events import EventLog, read_events, replay
+from .sweep import sweep
+from .tenants import run_tenants
+from .sinks import FileSink, ThreadedSink
+from .delta import DeltaSink, read_delta
+from .columnar import ColumnarSink, load_columnar
+from .history import HistorySink, HistoryIndex
@@ -0,0 +1,53 @@
+"""
+    Bounded-work approximate mode for hub-dominated streams.
+
+    In the exact mode an edge between two hubs examines all their common
+    neighbors, and each common neighbor all its communities. The approximation
+    caps this community work:
+
+        max_common_neighbors   common neighbors examined by the evolution step and by a removal (a uniform
+                               sample of the hub neighborhood intersection when it is larger)
+        budget                 community checks per new edge (one per examined neighbor, plus one per
+                               community of the neighbor and per community shared by the endpoints): the
+                               propagation stops once it is spent
+
+    The rest stays exact, and its cost is not capped: the graph upkeep (triangle
+    counts are updated on every insertion and removal, so the centrality test
+    is exact) and the split detection of the communities touched by a removal,
+    which scans each community once. The approximation bounds the propagation
+    step of an interaction, not the latency of the expirations hitting large
+    communities. Sampling uses a seeded generator: runs are reproducible.
+"""
+import random
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+
+class Approximation(object):
+    """
+        Work caps of the approximate mode (None disables a cap)
+    """
+
+    def __init__(self, max_common_neighbors=64, budget=4096, seed=0):
+        """
+            Constructor
+            :param max_common_neighbors: common neighbors examined per edge
+            :param budget: community checks per new edge
+            :param seed: random seed of the neighborhood sampling
+        """
+        self.max_common_neighbors = max_common_neighbors
+        self.budget = budget
+        self.random = random.Random(seed)
+
+    def sample(self, nodes):
+        """
+            Common neighbors to examine
+            :param nodes: list of common neighbors
+            :return: nodes, or a uniform sample of max_common_neighbors of them
+        """
+        if self.max_common_neighbors is None or len(nodes) <= self.max_common_neighbors:
+            return nodes
+        return self.random.sample(nodes, self.max_common_neighbors)
@@ -0,0 +1,163 @@
+"""
+    Binary columnar output: every observation is stored as flat int64 NumPy arrays.
+
+    Each observation N is a folder slice-N containing:
+
+        meta.npy                  slice, start, end, nodes, added, removed, final
+        community_ids.npy         community identifiers
+        community_offsets.npy     CSR offsets: members of community_ids[i] are
+        community_members.npy     community_members[offsets[i]:offsets[i + 1]]
+        edges.npy                 3 x m array: u, v and weight rows
+        merge_*.npy               merges, same CSR layout as the communities
+        split_*.npy               splits, same CSR layout as the communities
+
+    Slices are loaded memory-mapped: no decompression and no parsing.
+"""
+import os
+from itertools import chain
+from .snapshot import Snapshot
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("The columnar format requires numpy (pip install tiles[fast])")
+
+
+def _csr(groups):
+    """
+        Flatten (id, list) pairs into ids, offsets and members arrays
+    """
+    ids = np.fromiter((k for k, _ in groups), dtype=np.int64, count=len(groups))
+    sizes = np.fromiter((len(v) for _, v in groups), dtype=np.int64, count=len(groups))
+    offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    members = np.fromiter(chain.from_iterable(v for _, v in groups), dtype=np.int64, count=int(offsets[-1]))
+    return ids, offsets, members
+
+
+class ColumnarSink(object):
+    """
+        Write every observation as int64 .npy arrays (see module documentation for the layout).
+    """
+
+    def __init__(self, path="", base=None):
+        """
+            Constructor
+            :param path: folder for the output files
+            :param base: folder path is relative to (default: current working directory)
+        """
+        _require_numpy()
+        if base is None:
+            base = os.getcwd()
+        self.folder = os.path.join(base, path)
+
+    def write(self, snapshot):
+        """
+            Write the observation arrays
+            :param snapshot: Snapshot
+        """
+        folder = os.path.join(self.folder, "slice-%d" % snapshot.slice)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        def save(name, array):
+            np.save(os.path.join(folder, "%s.npy" % name), array)
+
+        start = -1 if snapshot.start is None else snapshot.start
+        end = -1 if snapshot.end is None else snapshot.end
+        save("meta", np.array([snapshot.slice, start, end, snapshot.nodes, snapshot.added, snapshot.removed,
+                               int(snapshot.final)], dtype=np.int64))
+
+        for prefix, groups in [("community", list(snapshot.communities.items())),
+                               ("merge", list(snapshot.merges.items())),
+                               ("split", list(snapshot.splits))]:
+            ids, offsets, members = _csr(groups)
+            save("%s_ids" % prefix, ids)
+            save("%s_offsets" % prefix, offsets)
+            save("%s_members" % prefix, members)
+
+        m = len(snapshot.edges)
+        edges = np.fromiter(chain.from_iterable(snapshot.edges), dtype=np.int64, count=3 * m)
+        save("edges", edges.reshape(m, 3).T.copy())
+
+    def close(self):
+        pass
+
+
+class ColumnarSlice(object):
+    """
+        An observation loaded from the columnar format. Arrays are memory-mapped by default.
+    """
+
+    _arrays = ("meta", "community_ids", "community_offsets", "community_members", "edges",
+               "merge_ids", "merge_offsets", "merge_members", "split_ids", "split_offsets", "split_members")
+
+    def __init__(self, folder, mmap=True):
+        """
+            Constructor
+            :param folder: slice folder (slice-N)
+            :param mmap: memory-map the arrays instead of reading them
+        """
+        _require_numpy()
+        mode = "r" if mmap else None
+        for name in self._arrays:
+            setattr(self, name, np.load(os.path.join(folder, "%s.npy" % name), mmap_mode=mode))
+
+    @property
+    def slice(self):
+        return int(self.meta[0])
+
+    def __len__(self):
+        return len(self.community_ids)
+
+    def community(self, i):
+        """
+            Members of the i-th community of the slice
+            :param i: community position (not its identifier)
+            :return: array of node ids
+        """
+        return self.community_members[self.community_offsets[i]:self.community_offsets[i + 1]]
+
+    def communities(self):
+        """
+            Iterate over (community id, members array) pairs
+        """
+        for i in range(len(self.community_ids)):
+            yield int(self.community_ids[i]), self.community(i)
+
+    def to_snapshot(self):
+        """
+            Convert the slice in a Snapshot (python lists, no longer memory-mapped)
+        """
+        def groups(ids, offsets, members):
+            return [(int(ids[i]), members[offsets[i]:offsets[i + 1]].tolist()) for i in range(len(ids))]
+
+        meta = self.meta.tolist()
+        start = None if meta[1] == -1 else meta[1]
+        end = None if meta[2] == -1 else meta[2]
+        return Snapshot(meta[0], start, end,
+                        dict(groups(self.community_ids, self.community_offsets, self.community_members)),
+                        dict(groups(self.merge_ids, self.merge_offsets, self.merge_members)),
+                        groups(self.split_ids, self.split_offsets, self.split_members),
+                        [tuple(e) for e in self.edges.T.tolist()], meta[3], meta[4], meta[5], bool(meta[6]))
+
+
+def load_columnar(path, slice_id, mmap=True):
+    """
+        Load an observation written by a ColumnarSink
+        :param path: output folder
+        :param slice_id: observation identifier
+        :param mmap: memory-map the arrays instead of reading them
+        :return: ColumnarSlice
+    """
+    return ColumnarSlice(os.path.join(path, "slice-%d" % slice_id), mmap)
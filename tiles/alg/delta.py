@@ -0,0 +1,170 @@
+"""
+    Delta output: write only what changed since the previous observation.
+
+    Every keyframe observations a full dump is written (keyframe-N.gz), the
+    others only record the differences with their predecessor (delta-N.gz).
+    Each file starts with a header line followed by one record per line:
+
+        #   slice  start  end  nodes  added  removed  final
+        C   cid    [nodes]       community created or changed
+        D   cid                  community destroyed
+        E   u      v      w      edge added or reweighted
+        R   u      v             edge removed
+        M   cid    [cids]        communities merged into cid
+        S   cid    [cids]        communities generated by the split of cid
+"""
+import gzip
+import json
+import os
+from future.utils import iteritems
+from .snapshot import Snapshot
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+
+def _edge_key(u, v):
+    return (u, v) if u <= v else (v, u)
+
+
+class DeltaSink(object):
+    """
+        Write every observation as a delta against the previous one, with periodic full keyframes.
+    """
+
+    def __init__(self, path="", keyframe=10, base=None):
+        """
+            Constructor
+            :param path: folder for the output files
+            :param keyframe: number of observations between two full dumps
+            :param base: folder path is relative to (default: current working directory)
+        """
+        if base is None:
+            base = os.getcwd()
+        self.folder = os.path.join(base, path)
+        self.keyframe = keyframe
+        self.communities = {}
+        self.edges = {}
+
+    def write(self, snapshot):
+        """
+            Write the observation delta (or keyframe)
+            :param snapshot: Snapshot
+        """
+        full = snapshot.slice % self.keyframe == 0
+        name = "keyframe" if full else "delta"
+        lines = [u"#\t%d\t%s\t%s\t%d\t%d\t%d\t%d\n" % (snapshot.slice, snapshot.start, snapshot.end,
+                                                       snapshot.nodes, snapshot.added, snapshot.removed,
+                                                       snapshot.final)]
+
+        for cid, nodes in iteritems(snapshot.communities):
+            if full or self.communities.get(cid) != nodes:
+                lines.append(u"C\t%d\t%s\n" % (cid, str(nodes)))
+        if not full:
+            for cid in self.communities:
+                if cid not in snapshot.communities:
+                    lines.append(u"D\t%d\n" % cid)
+
+        edges = {}
+        for u, v, w in snapshot.edges:
+            key = _edge_key(u, v)
+            edges[key] = w
+            if full or self.edges.get(key) != w:
+                lines.append(u"E\t%d\t%d\t%d\n" % (u, v, w))
+        if not full:
+            for u, v in self.edges:
+                if (u, v) not in edges:
+                    lines.append(u"R\t%d\t%d\n" % (u, v))
+
+        for cid, merged in iteritems(snapshot.merges):
+            lines.append(u"M\t%d\t%s\n" % (cid, str(merged)))
+        for cid, new_ids in snapshot.splits:
+            lines.append(u"S\t%d\t%s\n" % (cid, str(new_ids)))
+
+        with gzip.open(os.path.join(self.folder, "%s-%d.gz" % (name, snapshot.slice)), "wt", 3) as out:
+            out.write(u"".join(lines))
+
+        self.communities = dict(snapshot.communities)
+        self.edges = edges
+
+    def close(self):
+        pass
+
+
+def _apply(fname, communities, edges):
+    header = None
+    merges = {}
+    splits = []
+    with gzip.open(fname, "rt") as f:
+        for line in f:
+            record = line.rstrip("\n").split("\t")
+            kind = record[0]
+            if kind == "C":
+                communities[int(record[1])] = json.loads(record[2])
+            elif kind == "D":
+                communities.pop(int(record[1]), None)
+            elif kind == "E":
+                u, v = int(record[1]), int(record[2])
+                edges[_edge_key(u, v)] = (u, v, int(record[3]))
+            elif kind == "R":
+                edges.pop((int(record[1]), int(record[2])), None)
+            elif kind == "M":
+                merges[int(record[1])] = json.loads(record[2])
+            elif kind == "S":
+                splits.append((int(record[1]), json.loads(record[2])))
+            elif kind == "#":
+                header = record
+    return header, merges, splits
+
+
+def _timestamp(value):
+    if value == "None":
+        return None
+    return int(value)
+
+
+def read_delta(path, slice_id=None):
+    """
+        Reconstruct the observations written by a DeltaSink
+        :param path: folder containing the delta files
+        :param slice_id: observation to reconstruct (None: iterate over all the observations)
+        :return: the Snapshot of slice_id, or a generator of Snapshots if slice_id is None
+    """
+    if slice_id is None:
+        return _iter_delta(path, 0, None)
+
+    # start from the closest keyframe
+    first = slice_id
+    while not os.path.exists(os.path.join(path, "keyframe-%d.gz" % first)):
+        first -= 1
+        if first < 0:
+            raise IOError("No keyframe found for slice %d in %s" % (slice_id, path))
+
+    for snapshot in _iter_delta(path, first, slice_id):
+        if snapshot.slice == slice_id:
+            return snapshot
+    raise IOError("Slice %d not found in %s" % (slice_id, path))
+
+
+def _iter_delta(path, first, last):
+    communities = {}
+    edges = {}
+    slice_id = first
+    while last is None or slice_id <= last:
+        keyframe = os.path.join(path, "keyframe-%d.gz" % slice_id)
+        delta = os.path.join(path, "delta-%d.gz" % slice_id)
+        if os.path.exists(keyframe):
+            communities = {}
+            edges = {}
+            fname = keyframe
+        elif os.path.exists(delta):
+            fname = delta
+        else:
+            return
+
+        header, merges, splits = _apply(fname, communities, edges)
+        yield Snapshot(slice_id, _timestamp(header[2]), _timestamp(header[3]), dict(communities), merges, splits,
+                       list(edges.values()), int(header[4]), int(header[5]), int(header[6]), header[7] == "1")
+        slice_id += 1
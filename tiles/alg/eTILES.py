@@ -3,20 +3,11 @@
     Created on 20/09/2016
     @author: Giulio Rossetti
 """
-import networkx as nx
-import gzip
-import datetime
-import time
-import copy
 from .TILES import TILES
+from .reader import REMOVE
+from .metrics import clock
 
 
-import sys
-if sys.version_info > (2, 7):
-    from io import StringIO
-else:
-    from cStringIO import StringIO
-
 __author__ = "Giulio Rossetti"
 __contact__ = "giulio.rossetti@gmail.com"
 __website__ = "about.giuliorossetti.net"
@@ -30,177 +21,136 @@ class eTILES(TILES):
         ***Explicit removal***
     """
 
-    def __init__(self, filename=None, g=None, obs=7, path="", start=None, end=None):
+    columns = 4
+
+    def __init__(self, filename=None, g=None, obs=7, path="", start=None, end=None, sinks=None, metrics=None,
+                 gc=False, codec="gzip", level=None, compress_threads=1, events=None, approx=None):
         """
             Constructor
-            :param g: networkx graph
+            :param g: graph backend (default: CompactGraph) or networkx graph
             :param obs: observation window (days)
             :param path: Path where generate the results and find the edge file
             :param start: starting date
             :param end: ending date
+            :param sinks: list of snapshot sinks (execute() defaults to a FileSink on path)
+            :param metrics: Metrics collecting the operational measures (execute() defaults to metrics.jsonl on path)
+            :param gc: drop the nodes left without edges and communities by a removal
+            :param codec: compression of the default FileSink output files (gzip, bz2, xz or none)
+            :param level: compression level (default: codec dependent, see FileSink)
+            :param compress_threads: compression threads of the default FileSink
+            :param events: EventLog receiving the community lifecycle events (optional)
+            :param approx: Approximation capping the community propagation work (optional, approximate communities)
         """
-        super(self.__class__, self).__init__(filename, g, 0,obs, path, start, end)
+        super(self.__class__, self).__init__(filename, g, 0, obs, path, start, end, sinks, metrics, gc, codec,
+                                             level, compress_threads, events, approx)
 
-    def execute(self):
+    def feed(self, edges, window=None):
         """
-            Execute TILES algorithm
+            Process a stream of interactions
+            :param edges: iterable of (action, u, v, timestamp) records, timestamps in epoch seconds
+            :param window: ignored: explicit removals are order dependent, interactions are processed one at a time
+            :return: generator of the Snapshots of the completed observations
         """
-        self.status.write(u"Started! (%s) \n\n" % str(time.asctime(time.localtime(time.time()))))
-        self.status.flush()
-
-        with open("%s" % self.filename, 'r') as f:
-            first_line = f.readline()
-
-        actual_time = datetime.datetime.fromtimestamp(float(first_line.rstrip().split("\t")[3]))
-        last_break = actual_time
-        f.close()
-
-        count = 0
-
-        #################################################
-        #                   Main Cycle                  #
-        #################################################
-
-        f = open("%s" % self.filename)
-        for l in f:
-            l = l.rstrip().split("\t")
-            self.added += 1
-            e = {}
-            action = l[0]
-            u = int(l[1])
-            v = int(l[2])
-            dt = datetime.datetime.fromtimestamp(float(l[3]))
-
-            e['weight'] = 1
-            e["u"] = u
-            e["v"] = v
-
-            #############################################
-            #               Observations                #
-            #############################################
-
-            gap = dt - last_break
-            dif = gap.days
-
-            if dif >= self.obs:
-                last_break = dt
-                self.added -= 1
-
-                print("New slice. Starting Day: %s" % dt)
-
-                self.status.write(u"Saving Slice %s: Starting %s ending %s - (%s)\n" %
-                                  (self.actual_slice, actual_time, dt,
-                                   str(time.asctime(time.localtime(time.time())))))
-
-                self.status.write(u"Edge Added: %d\tEdge removed: %d\n" % (self.added, self.removed))
-                self.added = 1
-                self.removed = 0
-
-                actual_time = dt
-                self.status.flush()
-
-                self.splits = gzip.open("%s/%s/splitting-%d.gz" % (self.base, self.path, self.actual_slice), "wt", 3)
-                self.splits.write(self.spl.getvalue())
-                self.splits.flush()
-                self.splits.close()
-                self.spl = StringIO()
-
-                self.print_communities()
-                self.status.write(
-                    u"\nStarted Slice %s (%s)\n" % (self.actual_slice, str(datetime.datetime.now().time())))
-
-            if u == v:
-                continue
-
-            # Check if edge removal is required
-            if action == '-':
-                self.remove_edge(e)
-                continue
-
-            if not self.g.has_node(u):
-                self.g.add_node(u)
-                self.g.nodes[u]['c_coms'] = {}
-
-            if not self.g.has_node(v):
-                self.g.add_node(v)
-                self.g.nodes[v]['c_coms'] = {}
-
-            if self.g.has_edge(u, v):
-                w = self.g.adj[u][v]["weight"]
-                self.g.adj[u][v]["weight"] = w + e['weight']
-                continue
-            else:
-                self.g.add_edge(u, v, weight=e['weight'])
-
-            u_n = list(self.g.neighbors(u))
-            v_n = list(self.g.neighbors(v))
-
-            #############################################
-            #               Evolution                   #
-            #############################################
-
-            # new community of peripheral nodes (new nodes)
-            if len(u_n) > 1 and len(v_n) > 1:
-                common_neighbors = set(u_n) & set(v_n)
-                self.common_neighbors_analysis(u, v, common_neighbors)
-
-            count += 1
+        for action, u, v, t in edges:
+            snapshot = self.process_edge(u, v, t, action)
+            if snapshot is not None:
+                yield snapshot
 
-        #  Last writing
-        self.status.write(u"Slice %s: Starting %s ending %s - (%s)\n" %
-                          (self.actual_slice, actual_time, actual_time,
-                           str(time.asctime(time.localtime(time.time())))))
-        self.status.write(u"Edge Added: %d\tEdge removed: %d\n" % (self.added, self.removed))
-        self.added = 0
-        self.removed = 0
+    def process_edge(self, u, v, t, action='+'):
+        """
+            Process a single interaction
+            :param u: a node
+            :param v: a node
+            :param t: timestamp (epoch seconds)
+            :param action: '+' (or reader.ADD) for edge creation, '-' (or reader.REMOVE) for edge removal
+            :return: the Snapshot of the observation completed by the interaction, None otherwise
+        """
+        snapshot = self.observe(t)
+
+        start = clock()
+        if action == REMOVE or action == '-':
+            if u != v:
+                self.remove_edge({'u': u, 'v': v, 'weight': 1})
+        else:
+            self.add_interaction(u, v, t)
+        self.metrics.add_time("ingest", clock() - start)
+        return snapshot
+
+    def add_interaction(self, u, v, t):
+        """
+            Update the graph and the communities with an interaction (no expiration)
+            :param u: a node
+            :param v: a node
+            :param t: timestamp (epoch seconds)
+        """
+        if u == v:
+            return
 
-        self.print_communities()
-        self.status.write(u"Finished! (%s)" % str(time.asctime(time.localtime(time.time()))))
-        self.status.flush()
-        self.status.close()
+        if self.g.has_edge(u, v):
+            w = self.g.weight(u, v)
+            self.g.set_weight(u, v, w + 1)
+            return
+        else:
+            common_neighbors = self.g.add_edge(u, v, 1)
+            self.metrics.incr("new_edges")
+
+        #############################################
+        #               Evolution                   #
+        #############################################
+
+        # new community of peripheral nodes (new nodes)
+        if self.g.degree(u) > 1 and self.g.degree(v) > 1:
+            start = clock()
+            self.common_neighbors_analysis(u, v, common_neighbors)
+            self.metrics.add_time("common_neighbors_analysis", clock() - start)
 
     def remove_edge(self, e):
         """
             Edge removal procedure
-            :param actual_time: timestamp of the last inserted edge
-            :param qr: Priority Queue containing the edges to be removed ordered by their timestamps
+            :param e: edge to be removed (dictionary with keys u, v)
         """
-
+        start = clock()
         coms_to_change = {}
 
         self.removed += 1
+        self.metrics.incr("removals")
         u = e["u"]
         v = e["v"]
 
         if self.g.has_edge(u, v):
 
             # u and v shared communities
-            if len(list(self.g.neighbors(u))) > 1 and len(list(self.g.neighbors(v))) > 1:
-                coms = set(self.g.nodes[u]['c_coms'].keys()) & set(self.g.nodes[v]['c_coms'].keys())
+            if self.g.degree(u) > 1 and self.g.degree(v) > 1:
+                coms = set(self.memberships.communities(u)) & set(self.memberships.communities(v))
+                cn = self.g.common_neighbors(u, v) if coms else []
+                if self.approx is not None:
+                    cn = self.approx.sample(cn)
 
                 for c in coms:
                     if c not in coms_to_change:
-                        cn = set(self.g.neighbors(u)) & set(self.g.neighbors(v))
                         coms_to_change[c] = [u, v]
-                        coms_to_change[c].extend(list(cn))
+                        coms_to_change[c].extend(cn)
                     else:
-                        cn = set(self.g.neighbors(u)) & set(self.g.neighbors(v))
-                        coms_to_change[c].extend(list(cn))
+                        coms_to_change[c].extend(cn)
                         coms_to_change[c].extend([u, v])
                         ctc = set(coms_to_change[c])
                         coms_to_change[c] = list(ctc)
             else:
-                if len(list(self.g.neighbors(u))) < 2:
-                    coms_u = copy.copy(list(self.g.nodes[u]['c_coms'].keys()))
+                if self.g.degree(u) < 2:
+                    coms_u = list(self.memberships.communities(u))
                     for cid in coms_u:
                         self.remove_from_community(u, cid)
 
-                if len(list(self.g.neighbors(v))) < 2:
-                    coms_v = copy.copy(list(self.g.nodes[v]['c_coms'].keys()))
+                if self.g.degree(v) < 2:
+                    coms_v = list(self.memberships.communities(v))
                     for cid in coms_v:
                         self.remove_from_community(v, cid)
 
             self.g.remove_edge(u, v)
+            self.metrics.incr("removed_edges")
+            if self.gc:
+                self.collect(u, v)
 
         # update of shared communities
         self.update_shared_coms(coms_to_change)
+        self.metrics.add_time("remove", clock() - start)
@@ -0,0 +1,120 @@
+"""
+    Community lifecycle events, emitted while the communities evolve.
+
+    Every event is a dictionary with the event kind, the stream time (timestamp
+    of the last processed interaction), the observation and the community id:
+
+        birth    community                 new community (members follow as growth events)
+        growth   community  node           node added to the community
+        shrink   community  node           node removed from the community
+        split    community  communities    components of the community that obtained a new id
+        merge    community  communities    communities merged into community (a death follows for each)
+        death    community                 community destroyed (all its members are gone)
+
+    Replaying the events up to the end of an observation gives its communities
+    (see replay), without reading the observation files.
+"""
+import json
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+
+class EventLog(object):
+    """
+        Append-only event log: JSON lines file and/or in-process callback
+    """
+
+    def __init__(self, filename=None, callback=None):
+        """
+            Constructor
+            :param filename: JSON lines file for the events (optional, overwritten)
+            :param callback: function called with every event dictionary (optional)
+        """
+        self.filename = filename
+        self.callback = callback
+        self.count = 0
+        self.out = None
+        # length of the file when the log was checkpointed
+        self.offset = None
+
+    def emit(self, kind, t, slice_id, cid, **data):
+        """
+            Record an event
+            :param kind: birth, growth, shrink, split, merge or death
+            :param t: stream time (epoch seconds)
+            :param slice_id: actual observation
+            :param cid: community id
+            :param data: event specific fields (node, communities)
+        """
+        event = {"event": kind, "time": t, "slice": slice_id, "community": cid}
+        event.update(data)
+        self.count += 1
+
+        if self.filename is not None:
+            if self.out is None:
+                if self.offset is None:
+                    self.out = open(self.filename, "w")
+                else:
+                    # resumed from a checkpoint: discard the events logged after it
+                    self.out = open(self.filename, "r+")
+                    self.out.seek(self.offset)
+                    self.out.truncate()
+                    self.offset = None
+            self.out.write(json.dumps(event, sort_keys=True))
+            self.out.write("\n")
+        if self.callback is not None:
+            self.callback(event)
+
+    def flush(self):
+        if self.out is not None:
+            self.out.flush()
+
+    def close(self):
+        if self.out is not None:
+            self.out.close()
+            self.out = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.out is not None:
+            self.out.flush()
+            state["offset"] = self.out.tell()
+        state["out"] = None
+        return state
+
+
+def read_events(filename):
+    """
+        Read an event log
+        :param filename: JSON lines file written by an EventLog
+        :return: generator of event dictionaries
+    """
+    with open(filename) as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def replay(events, communities=None):
+    """
+        Apply events to a community state
+        :param events: iterable of event dictionaries
+        :param communities: community id -> set of nodes to update (default: empty state)
+        :return: the updated communities
+    """
+    if communities is None:
+        communities = {}
+    for event in events:
+        kind = event["event"]
+        cid = event["community"]
+        if kind == "growth":
+            communities.setdefault(cid, set()).add(event["node"])
+        elif kind == "shrink":
+            communities.get(cid, set()).discard(event["node"])
+        elif kind == "birth":
+            communities[cid] = set()
+        elif kind == "death":
+            communities.pop(cid, None)
+    return communities
@@ -0,0 +1,100 @@
+"""
+    Edge expiry for TILES (TTL mode).
+"""
+import math
+from collections import deque
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+DAY = 86400
+
+
+class ExpiryWheel(object):
+    """
+        Day-bucketed timing wheel holding the interactions waiting to expire.
+
+        Interactions are appended to the bucket of the day they happened and,
+        since the stream is chronologically ordered, every bucket is a FIFO
+        already sorted by timestamp: insertion, peek and expiry are O(1) and
+        whole buckets are released at once when their day falls out of the ttl.
+        An entry can account for several occurrences of the same interaction.
+    """
+
+    def __init__(self, ttl):
+        """
+            Constructor
+            :param ttl: edge time to live (days)
+        """
+        self.ttl = ttl
+        # an interaction expires when at least ttl whole days are elapsed
+        if math.isinf(ttl):
+            self.span = ttl
+        else:
+            self.span = int(math.ceil(ttl)) * DAY
+        self._buckets = {}
+        self._days = deque()
+        self._size = 0
+
+    def __len__(self):
+        # interactions waiting to expire
+        return self._size
+
+    def push(self, timestamp, u, v, count=1):
+        """
+            Schedule the expiry of an interaction
+            :param timestamp: interaction timestamp (epoch seconds)
+            :param u: a node
+            :param v: a node
+            :param count: number of occurrences of the interaction
+        """
+        day = int(timestamp // DAY)
+        bucket = self._buckets.get(day)
+        if bucket is None:
+            bucket = deque()
+            self._buckets[day] = bucket
+            self._days.append(day)
+        bucket.append((timestamp, u, v, count))
+        self._size += count
+
+    def peek(self):
+        """
+            Oldest scheduled interaction (None if the wheel is empty)
+        """
+        if not self._days:
+            return None
+        return self._buckets[self._days[0]][0]
+
+    def expired(self, actual_time):
+        """
+            Pop the interactions whose ttl is elapsed, oldest first
+            :param actual_time: timestamp of the last inserted edge (epoch seconds)
+            :return: generator of (u, v, count) triples
+        """
+        limit = actual_time - self.span
+
+        while self._days:
+            day = self._days[0]
+            bucket = self._buckets[day]
+
+            if (day + 1) * DAY <= limit:
+                # the whole day is expired: release the bucket in one pass
+                del self._buckets[day]
+                self._days.popleft()
+                for _, u, v, count in bucket:
+                    self._size -= count
+                    yield u, v, count
+                continue
+
+            while bucket and bucket[0][0] <= limit:
+                _, u, v, count = bucket.popleft()
+                self._size -= count
+                yield u, v, count
+
+            if bucket:
+                return
+
+            del self._buckets[day]
+            self._days.popleft()
@@ -0,0 +1,319 @@
+"""
+    Graph backends used by TILES.
+
+    TILES only needs a handful of operations on the evolving graph: node and
+    edge existence tests, weighted edge insertion/removal, neighborhood access,
+    per-node triangle counts and connected
+    components of a node subset.
+    ``CompactGraph`` implements them on top of ``__slots__`` node records,
+    while ``NetworkXGraph`` adapts an existing ``networkx.Graph``.
+"""
+from future.utils import iteritems
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+
+def _intersection(a, b):
+    """
+        Keys shared by two dictionaries, iterating over the smaller one
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    return [z for z in a if z in b]
+
+
+class _Node(object):
+    """
+        Node record: weighted adjacency and triangle count
+    """
+    __slots__ = ('nbrs', 'tri')
+
+    def __init__(self):
+        # neighbor -> edge weight (insertion ordered, as in networkx)
+        self.nbrs = {}
+        self.tri = 0
+
+
+class CompactGraph(object):
+    """
+        Purpose-built undirected weighted graph.
+
+        Edge weights are stored directly as the values of the adjacency
+        dictionaries, so an edge costs two dictionary slots instead of the
+        two slots plus a shared attribute dictionary used by networkx.
+        Neighbors are kept in insertion order: every traversal (and therefore
+        the community output) matches the networkx backend.
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._size = 0
+
+    def __contains__(self, u):
+        return u in self._nodes
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def has_node(self, u):
+        return u in self._nodes
+
+    def add_node(self, u):
+        if u not in self._nodes:
+            self._nodes[u] = _Node()
+
+    def remove_node(self, u):
+        """
+            Remove an isolated node
+            :param u: a node with no edges
+        """
+        del self._nodes[u]
+
+    def nodes(self):
+        return self._nodes.keys()
+
+    def number_of_nodes(self):
+        return len(self._nodes)
+
+    def number_of_edges(self):
+        return self._size
+
+    def has_edge(self, u, v):
+        node = self._nodes.get(u)
+        return node is not None and v in node.nbrs
+
+    def add_edge(self, u, v, weight=1):
+        """
+            Add the edge (u, v), creating the missing endpoints
+            :param u: a node
+            :param v: a node
+            :param weight: edge weight
+            :return: list of the common neighbors of u and v
+        """
+        self.add_node(u)
+        self.add_node(v)
+        nbrs = self._nodes[u].nbrs
+        cn = []
+        if v not in nbrs:
+            self._size += 1
+            cn = self._update_triangles(u, v, 1)
+        nbrs[v] = weight
+        self._nodes[v].nbrs[u] = weight
+        return cn
+
+    def remove_edge(self, u, v):
+        """
+            Remove the edge (u, v)
+            :param u: a node
+            :param v: a node
+            :return: list of the common neighbors of u and v
+        """
+        del self._nodes[u].nbrs[v]
+        del self._nodes[v].nbrs[u]
+        self._size -= 1
+        return self._update_triangles(u, v, -1)
+
+    def _update_triangles(self, u, v, delta):
+        cn = self.common_neighbors(u, v)
+        if cn:
+            nodes = self._nodes
+            nodes[u].tri += delta * len(cn)
+            nodes[v].tri += delta * len(cn)
+            for z in cn:
+                nodes[z].tri += delta
+        return cn
+
+    def triangles(self, u):
+        """
+            Number of triangles u belongs to
+            :param u: a node
+        """
+        return self._nodes[u].tri
+
+    def weight(self, u, v):
+        return self._nodes[u].nbrs[v]
+
+    def set_weight(self, u, v, weight):
+        self._nodes[u].nbrs[v] = weight
+        self._nodes[v].nbrs[u] = weight
+
+    def neighbors(self, u):
+        """
+            Read-only view on the neighbors of u (no copy)
+            :param u: a node
+        """
+        return self._nodes[u].nbrs.keys()
+
+    def degree(self, u):
+        return len(self._nodes[u].nbrs)
+
+    def common_neighbors(self, u, v):
+        """
+            Common neighbors of u and v: scans the smaller neighborhood and probes
+            the larger one in place, so the cost is O(min(deg(u), deg(v))) and
+            no neighbor set is copied (hubs stay cheap)
+            :param u: a node
+            :param v: a node
+            :return: list of nodes
+        """
+        return _intersection(self._nodes[u].nbrs, self._nodes[v].nbrs)
+
+    def edges(self):
+        """
+            Iterate over the edges as (u, v, weight) triples, each edge once
+        """
+        seen = set()
+        for u, node in iteritems(self._nodes):
+            for v, w in iteritems(node.nbrs):
+                if v not in seen:
+                    yield u, v, w
+            seen.add(u)
+
+    def subgraph_nodes(self, nodes):
+        """
+            Nodes of the subgraph induced by nodes, enumerated in the same order
+            as a networkx subgraph view (which makes the backends interchangeable)
+            :param nodes: node subset
+            :return: list of nodes
+        """
+        selected = set(n for n in nodes if n in self._nodes)
+        if 2 * len(selected) < len(self._nodes):
+            return list(selected)
+        return [n for n in self._nodes if n in selected]
+
+    def connected_components(self, nodes):
+        """
+            Connected components of the subgraph induced by nodes
+            :param nodes: node subset
+            :return: generator of node sets
+        """
+        ordered = self.subgraph_nodes(nodes)
+        allowed = set(ordered)
+        seen = set()
+        for source in ordered:
+            if source in seen:
+                continue
+            component = {source}
+            frontier = [source]
+            while frontier:
+                level = frontier
+                frontier = []
+                for x in level:
+                    for y in self._nodes[x].nbrs:
+                        if y in allowed and y not in component:
+                            component.add(y)
+                            frontier.append(y)
+            seen |= component
+            yield component
+
+
+class NetworkXGraph(object):
+    """
+        Adapter exposing a networkx.Graph through the CompactGraph interface.
+        Triangle counts are stored in the 'tri' node attribute and edge weights in the
+        'weight' edge attribute (community memberships are kept by TILES, see memberships.py).
+    """
+
+    def __init__(self, g):
+        import networkx as nx
+        self.g = g
+        triangles = nx.triangles(g) if g.number_of_edges() > 0 else {}
+        for u in g.nodes():
+            g.nodes[u]['tri'] = triangles.get(u, 0)
+        for u, v in g.edges():
+            g.adj[u][v].setdefault('weight', 1)
+
+    def __contains__(self, u):
+        return self.g.has_node(u)
+
+    def __len__(self):
+        return self.g.number_of_nodes()
+
+    def has_node(self, u):
+        return self.g.has_node(u)
+
+    def add_node(self, u):
+        if not self.g.has_node(u):
+            self.g.add_node(u, tri=0)
+
+    def remove_node(self, u):
+        self.g.remove_node(u)
+
+    def nodes(self):
+        return self.g.nodes()
+
+    def number_of_nodes(self):
+        return self.g.number_of_nodes()
+
+    def number_of_edges(self):
+        return self.g.number_of_edges()
+
+    def has_edge(self, u, v):
+        return self.g.has_edge(u, v)
+
+    def add_edge(self, u, v, weight=1):
+        self.add_node(u)
+        self.add_node(v)
+        cn = []
+        if not self.g.has_edge(u, v):
+            cn = self._update_triangles(u, v, 1)
+        self.g.add_edge(u, v, weight=weight)
+        return cn
+
+    def remove_edge(self, u, v):
+        self.g.remove_edge(u, v)
+        return self._update_triangles(u, v, -1)
+
+    def _update_triangles(self, u, v, delta):
+        cn = self.common_neighbors(u, v)
+        if cn:
+            nodes = self.g.nodes
+            nodes[u]['tri'] += delta * len(cn)
+            nodes[v]['tri'] += delta * len(cn)
+            for z in cn:
+                nodes[z]['tri'] += delta
+        return cn
+
+    def triangles(self, u):
+        return self.g.nodes[u]['tri']
+
+    def weight(self, u, v):
+        return self.g.adj[u][v]['weight']
+
+    def set_weight(self, u, v, weight):
+        self.g.adj[u][v]['weight'] = weight
+
+    def neighbors(self, u):
+        return self.g.adj[u].keys()
+
+    def degree(self, u):
+        return len(self.g.adj[u])
+
+    def common_neighbors(self, u, v):
+        return _intersection(self.g.adj[u], self.g.adj[v])
+
+    def edges(self):
+        for u, v, w in self.g.edges(data='weight'):
+            yield u, v, w
+
+    def subgraph_nodes(self, nodes):
+        return list(self.g.subgraph(nodes).nodes())
+
+    def connected_components(self, nodes):
+        import networkx as nx
+        return nx.connected_components(self.g.subgraph(nodes))
+
+
+def as_graph(g=None):
+    """
+        Return the graph backend to be used by TILES
+        :param g: None (CompactGraph), a graph backend or a networkx graph
+    """
+    if g is None:
+        return CompactGraph()
+    if isinstance(g, (CompactGraph, NetworkXGraph)):
+        return g
+    return NetworkXGraph(g)
@@ -0,0 +1,233 @@
+"""
+    Node/community history index: a SQLite database updated at every observation.
+
+    Memberships are stored as slice intervals, written only when they change
+    (a node joining or leaving a community), so each observation costs
+    O(changes) and a lookup is an indexed query, whatever the number of slices:
+
+        slices       slice, start, end, nodes, communities
+        memberships  node, community, first_slice, last_slice (NULL: still a member)
+        merges       slice, community, merged      (merged absorbed by community)
+        splits       slice, community, component   (component split from community)
+"""
+import os
+import sqlite3
+from future.utils import iteritems
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slices (slice INTEGER PRIMARY KEY, start INTEGER, end INTEGER, nodes INTEGER,
+                                   communities INTEGER);
+CREATE TABLE IF NOT EXISTS memberships (node INTEGER, community INTEGER, first_slice INTEGER, last_slice INTEGER);
+CREATE INDEX IF NOT EXISTS memberships_node ON memberships (node, first_slice);
+CREATE INDEX IF NOT EXISTS memberships_community ON memberships (community, node);
+CREATE TABLE IF NOT EXISTS merges (slice INTEGER, community INTEGER, merged INTEGER);
+CREATE INDEX IF NOT EXISTS merges_community ON merges (community);
+CREATE INDEX IF NOT EXISTS merges_merged ON merges (merged);
+CREATE TABLE IF NOT EXISTS splits (slice INTEGER, community INTEGER, component INTEGER);
+CREATE INDEX IF NOT EXISTS splits_community ON splits (community);
+CREATE INDEX IF NOT EXISTS splits_component ON splits (component);
+"""
+
+
+class HistorySink(object):
+    """
+        Maintain the history index of the observations (see module documentation for the schema).
+    """
+
+    def __init__(self, filename="history.db"):
+        """
+            Constructor
+            :param filename: SQLite database (overwritten)
+        """
+        self.filename = os.path.abspath(filename)
+        self.db = None
+        # community id -> set of nodes of the last indexed observation
+        self.communities = {}
+        # last indexed observation when the sink was checkpointed
+        self.checkpoint = None
+
+    def _connect(self):
+        if self.checkpoint is None and os.path.exists(self.filename):
+            os.remove(self.filename)
+        # a ThreadedSink opens the connection on its writer thread, while close and the
+        # checkpoints run on the caller's one (never concurrently: both wait for the writer)
+        self.db = sqlite3.connect(self.filename, check_same_thread=False)
+        self.db.executescript(_SCHEMA)
+        if self.checkpoint is not None:
+            # resumed from a checkpoint: discard what was indexed after it
+            s = self.checkpoint
+            with self.db:
+                self.db.execute("DELETE FROM memberships WHERE first_slice > ?", (s,))
+                self.db.execute("UPDATE memberships SET last_slice = NULL WHERE last_slice >= ?", (s,))
+                for table in ("slices", "merges", "splits"):
+                    self.db.execute("DELETE FROM %s WHERE slice > ?" % table, (s,))
+            self.checkpoint = None
+
+    def write(self, snapshot):
+        """
+            Index the changes of the observation
+            :param snapshot: Snapshot
+        """
+        if self.db is None:
+            self._connect()
+
+        s = snapshot.slice
+        joined = []
+        left = []
+        current = {}
+        for cid, nodes in iteritems(snapshot.communities):
+            nodes = set(nodes)
+            current[cid] = nodes
+            previous = self.communities.get(cid)
+            if previous is None:
+                joined.extend((n, cid, s) for n in nodes)
+            elif previous != nodes:
+                joined.extend((n, cid, s) for n in nodes - previous)
+                left.extend((s - 1, n, cid) for n in previous - nodes)
+        for cid, nodes in iteritems(self.communities):
+            if cid not in current:
+                left.extend((s - 1, n, cid) for n in nodes)
+
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO slices VALUES (?, ?, ?, ?, ?)",
+                            (s, snapshot.start, snapshot.end, snapshot.nodes, len(current)))
+            self.db.executemany("UPDATE memberships SET last_slice = ? "
+                                "WHERE community = ? AND node = ? AND last_slice IS NULL",
+                                ((last, cid, n) for last, n, cid in left))
+            self.db.executemany("INSERT INTO memberships VALUES (?, ?, ?, NULL)", joined)
+            self.db.executemany("INSERT INTO merges VALUES (?, ?, ?)",
+                                ((s, cid, m) for cid, merged in iteritems(snapshot.merges) for m in merged))
+            self.db.executemany("INSERT INTO splits VALUES (?, ?, ?)",
+                                ((s, cid, c) for cid, new_ids in snapshot.splits for c in new_ids))
+        self.communities = current
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.db is not None:
+            row = self.db.execute("SELECT MAX(slice) FROM slices").fetchone()
+            state["checkpoint"] = -1 if row[0] is None else row[0]
+        state["db"] = None
+        return state
+
+
+class HistoryIndex(object):
+    """
+        Query API of a history index written by a HistorySink.
+        Slice bounds are inclusive; None leaves a bound open.
+    """
+
+    def __init__(self, filename):
+        """
+            Constructor
+            :param filename: SQLite database written by a HistorySink
+        """
+        if not os.path.exists(filename):
+            raise IOError("History index %s not found" % filename)
+        self.db = sqlite3.connect(filename)
+
+    def close(self):
+        self.db.close()
+
+    def _last(self):
+        return self.db.execute("SELECT MAX(slice) FROM slices").fetchone()[0]
+
+    def slices(self, first=None, last=None):
+        """
+            Observations in a slice range
+            :return: list of (slice, start, end, nodes, communities)
+        """
+        return self.db.execute("SELECT * FROM slices WHERE slice >= ? AND slice <= ? ORDER BY slice",
+                               _bounds(first, last)).fetchall()
+
+    def slice_range(self, start=None, end=None):
+        """
+            Observations overlapping a time range (an observation covers [start, end), the end of an
+            observation being the start of the next one; the last one also covers its end)
+            :param start: epoch seconds (None: from the first observation)
+            :param end: epoch seconds (None: up to the last observation)
+            :return: (first slice, last slice), (None, None) if no observation overlaps the range
+        """
+        start = -(1 << 62) if start is None else start
+        end = 1 << 62 if end is None else end
+        return tuple(self.db.execute("SELECT MIN(slice), MAX(slice) FROM slices WHERE start <= ? "
+                                     "AND (end > ? OR slice = (SELECT MAX(slice) FROM slices))",
+                                     (end, start)).fetchone())
+
+    def node_history(self, node, first=None, last=None):
+        """
+            Community memberships of a node
+            :param node: a node
+            :param first: first slice of the range
+            :param last: last slice of the range
+            :return: list of (community id, first slice, last slice) intervals, clipped to the range
+        """
+        lo, hi = _bounds(first, last)
+        end = self._last()
+        rows = self.db.execute("SELECT community, first_slice, last_slice FROM memberships "
+                               "WHERE node = ? AND first_slice <= ? AND (last_slice IS NULL OR last_slice >= ?) "
+                               "ORDER BY first_slice, community", (node, hi, lo))
+        return [(cid, max(f, lo), min(end if l is None else l, hi)) for cid, f, l in rows]
+
+    def communities_of(self, node, slice_id):
+        """
+            Communities of a node in an observation
+            :return: sorted list of community ids
+        """
+        return sorted(cid for cid, _, _ in self.node_history(node, slice_id, slice_id))
+
+    def community_history(self, cid, first=None, last=None):
+        """
+            Members of a community in each observation of the range where it exists
+            :param cid: community id
+            :param first: first slice of the range
+            :param last: last slice of the range
+            :return: dictionary slice -> sorted list of nodes
+        """
+        lo, hi = _bounds(first, last)
+        end = self._last()
+        if end is None:
+            return {}
+        history = {}
+        rows = self.db.execute("SELECT node, first_slice, last_slice FROM memberships "
+                               "WHERE community = ? AND first_slice <= ? AND (last_slice IS NULL OR last_slice >= ?)",
+                               (cid, hi, lo))
+        for node, f, l in rows:
+            for s in range(max(f, lo), min(end if l is None else l, hi) + 1):
+                history.setdefault(s, []).append(node)
+        for nodes in history.values():
+            nodes.sort()
+        return history
+
+    def members(self, cid, slice_id):
+        """
+            Members of a community in an observation
+            :return: sorted list of nodes (empty if the community does not exist)
+        """
+        return self.community_history(cid, slice_id, slice_id).get(slice_id, [])
+
+    def lineage(self, cid):
+        """
+            Merge and split events involving a community
+            :return: dictionary with merged_into, absorbed, split_from and split_into lists of (slice, community id)
+        """
+        def query(sql):
+            return [tuple(r) for r in self.db.execute(sql, (cid,))]
+
+        return {"merged_into": query("SELECT slice, community FROM merges WHERE merged = ? ORDER BY slice"),
+                "absorbed": query("SELECT slice, merged FROM merges WHERE community = ? ORDER BY slice"),
+                "split_from": query("SELECT slice, community FROM splits WHERE component = ? ORDER BY slice"),
+                "split_into": query("SELECT slice, component FROM splits WHERE community = ? ORDER BY slice")}
+
+
+def _bounds(first, last):
+    return (-1 if first is None else first, 1 << 62 if last is None else last)
@@ -0,0 +1,122 @@
+"""
+    Community membership store: a bidirectional index between communities and nodes.
+
+    Both directions are kept in insertion order (the traversals, and therefore
+    the community output, depend on it):
+
+        community id -> members    dictionary node -> None (an ordered set)
+        node -> community ids      tuple while the node belongs to a few
+                                   communities, dictionary cid -> None beyond
+                                   TUPLE_MAX memberships; nodes without
+                                   memberships are not stored at all
+
+    Most nodes belong to zero or one community: a one element tuple costs
+    about a quarter of the smallest dictionary, and the empty membership
+    dictionary previously attached to every graph node disappears.
+"""
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+# memberships of a node stored in a tuple (updates copy the tuple, O(k))
+TUPLE_MAX = 8
+
+_EMPTY = ()
+
+
+class Memberships(object):
+    """
+        Node <-> community index
+    """
+
+    def __init__(self):
+        # community id -> {node: None}
+        self.members = {}
+        # node -> tuple or {cid: None}
+        self._nodes = {}
+
+    def __len__(self):
+        return len(self.members)
+
+    def communities(self, node):
+        """
+            Community memberships of a node, in insertion order
+            :param node: a node
+            :return: read-only container of community ids (tuple or dictionary keys), empty if none
+        """
+        return self._nodes.get(node, _EMPTY)
+
+    def add(self, node, cid):
+        """
+            Add node to the community cid, creating the community if needed
+            :param node: a node
+            :param cid: community id
+            :return: True if the node was not a member of the community
+        """
+        coms = self._nodes.get(node, _EMPTY)
+        if type(coms) is dict:
+            coms[cid] = None
+        elif cid not in coms:
+            if len(coms) < TUPLE_MAX:
+                self._nodes[node] = coms + (cid,)
+            else:
+                coms = dict.fromkeys(coms)
+                coms[cid] = None
+                self._nodes[node] = coms
+
+        members = self.members.get(cid)
+        if members is None:
+            self.members[cid] = {node: None}
+            return True
+        if node in members:
+            return False
+        members[node] = None
+        return True
+
+    def remove(self, node, cid):
+        """
+            Remove node from the community cid (the community is kept, even if empty)
+            :param node: a node
+            :param cid: community id
+            :return: True if the node was a member of the community
+        """
+        if not self._drop(node, cid):
+            return False
+
+        members = self.members.get(cid)
+        if members is not None and node in members:
+            del members[node]
+            return True
+        return False
+
+    def destroy(self, cid):
+        """
+            Remove a community and all its memberships
+            :param cid: community id
+            :return: the former members (node -> None), None for an unknown community
+        """
+        members = self.members.pop(cid, None)
+        if members is not None:
+            for node in members:
+                self._drop(node, cid)
+        return members
+
+    def _drop(self, node, cid):
+        """
+            Remove cid from the memberships of node
+            :return: True if node had the membership
+        """
+        coms = self._nodes.get(node, _EMPTY)
+        if cid not in coms:
+            return False
+        if type(coms) is dict:
+            del coms[cid]
+            if not coms:
+                del self._nodes[node]
+        elif len(coms) == 1:
+            del self._nodes[node]
+        else:
+            self._nodes[node] = tuple(c for c in coms if c != cid)
+        return True
@@ -0,0 +1,134 @@
+"""
+    Operational metrics of a TILES run: counters, cumulative timers and gauges.
+
+    At the end of every observation the values accumulated during the slice are
+    collected in a record, kept in memory (Metrics.history) and optionally
+    written as a line of a JSON lines file.
+
+    Timers measured by TILES (seconds, nested phases are included in the outer ones):
+
+        ingest                     interaction processing (remove and common_neighbors_analysis included)
+        remove                     TTL/explicit edge removal (update_shared_coms included)
+        common_neighbors_analysis  community propagation/creation after an edge insertion
+        update_shared_coms         split detection of the communities affected by a removal
+        snapshot                   merge detection and Snapshot build
+        write                      sink writes (enqueue time for a ThreadedSink)
+
+    Counters: interactions, new_edges, removals (expired or explicitly removed interactions), removed_edges,
+    new_communities, merged, splits, coalesced (repeated interactions merged by a micro-batch),
+    collected_nodes (isolated nodes dropped, see the gc option), sampled_edges and exhausted_budgets (new edges
+    whose common neighbors were sampled, whose propagation was cut by the budget, see approx.Approximation).
+    Gauges (at the end of the slice): nodes, edges, communities, queue (interactions waiting to expire).
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    from time import perf_counter as clock
+except ImportError:  # pragma: no cover
+    from time import time as clock
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+
+class Metrics(object):
+    """
+        Counters and timers are cumulative over the whole run; gauges hold the last observed value.
+    """
+
+    def __init__(self, filename=None):
+        """
+            Constructor
+            :param filename: JSON lines file for the per-slice records (optional, overwritten)
+        """
+        self.filename = filename
+        self.counters = {}
+        self.timers = {}
+        self.gauges = {}
+        self.history = []
+        self._last_counters = {}
+        self._last_timers = {}
+        self._mode = "w"
+        # length of the JSON lines file when the metrics were checkpointed
+        self._offset = None
+
+    def incr(self, name, value=1):
+        """
+            Increment a counter
+            :param name: counter name
+            :param value: increment
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_time(self, name, seconds):
+        """
+            Add elapsed time to a timer
+            :param name: timer name
+            :param seconds: elapsed time
+        """
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, name):
+        """
+            Time a block of code
+            :param name: timer name
+        """
+        start = clock()
+        try:
+            yield
+        finally:
+            self.add_time(name, clock() - start)
+
+    def gauge(self, name, value):
+        """
+            Set a gauge
+            :param name: gauge name
+            :param value: actual value
+        """
+        self.gauges[name] = value
+
+    def record(self, slice_id):
+        """
+            Close the metrics of an observation
+            :param slice_id: observation identifier
+            :return: record with the counters and timers accumulated during the slice and the actual gauges
+        """
+        record = {"slice": slice_id, "time": time.time(),
+                  "counters": dict((k, v - self._last_counters.get(k, 0)) for k, v in self.counters.items()),
+                  "timers": dict((k, v - self._last_timers.get(k, 0.0)) for k, v in self.timers.items()),
+                  "gauges": dict(self.gauges)}
+        self._last_counters = dict(self.counters)
+        self._last_timers = dict(self.timers)
+        self.history.append(record)
+
+        if self.filename is not None:
+            with open(self.filename, self._mode) as f:
+                if self._offset is not None:
+                    # resumed from a checkpoint: discard the records written after it
+                    f.seek(self._offset)
+                    f.truncate()
+                    self._offset = None
+                f.write(json.dumps(record, sort_keys=True))
+                f.write("\n")
+            self._mode = "a"
+        return record
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self._mode == "a":
+            state["_offset"] = os.path.getsize(self.filename)
+            state["_mode"] = "r+"
+        return state
+
+    def totals(self):
+        """
+            Cumulative values of the whole run
+            :return: dictionary with counters, timers and gauges
+        """
+        return {"counters": dict(self.counters), "timers": dict(self.timers), "gauges": dict(self.gauges)}
@@ -0,0 +1,237 @@
+"""
+    Bulk ingestion of TILES edge streams.
+
+    The input file is read in large chunks cut at line boundaries, and every
+    chunk is parsed at once into int64 columns (NumPy when available, plain
+    lists otherwise). Timestamps are kept as integer epoch seconds.
+
+    gzip, bzip2 and xz files (detected from their content) are decompressed on
+    the fly and "-" reads the standard input: for these streams the reading and
+    decompression run on a separate thread, overlapped with parsing.
+"""
+import bz2
+import gzip
+import sys
+import threading
+
+if sys.version_info > (2, 7):
+    from queue import Queue, Full
+else:
+    from Queue import Queue, Full
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+try:
+    import lzma
+except ImportError:  # pragma: no cover
+    lzma = None
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+CHUNK_SIZE = 1 << 22
+
+# seconds the reader thread of an interactive stream (e.g. a terminal or a pipe) is waited for when the
+# consumer stops early: the thread is a daemon, blocked in a read that may never return
+DETACH_TIMEOUT = 1.0
+
+# eTILES actions
+ADD = 1
+REMOVE = -1
+
+
+def _to_int(column):
+    try:
+        return column.astype(np.int64)
+    except ValueError:
+        # non integer timestamps: truncate to seconds
+        return column.astype(np.float64).astype(np.int64)
+
+
+def _parse_lines(data, columns):
+    rows = [l.split(b"\t")[:columns] for l in data.splitlines() if l.strip()]
+    if columns == 4:
+        actions = [REMOVE if r[0].strip() == b"-" else ADD for r in rows]
+        rows = [r[1:] for r in rows]
+    parsed = [[int(r[0]), int(r[1]), int(float(r[2]))] for r in rows]
+    cols = [list(c) for c in zip(*parsed)] if parsed else [[], [], []]
+    if columns == 4:
+        cols.insert(0, actions)
+    if np is not None:
+        cols = [np.array(c, dtype=np.int64) for c in cols]
+    return tuple(cols)
+
+
+def parse_chunk(data, columns=3):
+    """
+        Parse a block of complete lines into int64 columns
+        :param data: bytes, one record per line (tab separated)
+        :param columns: 3 for TILES (u, v, t), 4 for eTILES (action, u, v, t)
+        :return: tuple of columns
+    """
+    if np is None:
+        return _parse_lines(data, columns)
+
+    # fast path: exactly `columns` tab separated fields on every line
+    if not data.endswith(b"\n"):
+        return _parse_lines(data, columns)
+    buf = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(buf == ord("\n"))
+    tabs = np.searchsorted(np.flatnonzero(buf == ord("\t")), ends)
+    if tabs[0] != columns - 1 or (np.diff(tabs) != columns - 1).any():
+        return _parse_lines(data, columns)
+
+    tokens = data.replace(b"\n", b"\t").split(b"\t")[:-1]
+    table = np.array(tokens).reshape(-1, columns)
+    cols = [_to_int(table[:, i]) for i in range(columns - 3, columns)]
+    if columns == 4:
+        actions = np.where(np.char.strip(table[:, 0]) == b"-", REMOVE, ADD).astype(np.int64)
+        cols.insert(0, actions)
+    return tuple(cols)
+
+
+def open_stream(filename):
+    """
+        Open an edge stream for binary reading
+        :param filename: edge stream filename (plain, gzip, bzip2 or xz), "-" for the standard input
+        :return: (file object, True for compressed files and the standard input)
+    """
+    if filename == "-":
+        return getattr(sys.stdin, "buffer", sys.stdin), True
+
+    with open(filename, "rb") as f:
+        magic = f.read(6)
+    if magic.startswith(b"\x1f\x8b"):
+        return gzip.open(filename, "rb"), True
+    if magic.startswith(b"BZh"):
+        return bz2.BZ2File(filename, "rb"), True
+    if magic.startswith(b"\xfd7zXZ\x00"):
+        if lzma is None:
+            raise IOError("Reading xz files requires the lzma module")
+        return lzma.open(filename, "rb"), True
+    return open(filename, "rb"), False
+
+
+def _read_blocks(f, chunk_size, threaded, interactive=False):
+    if not threaded:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                return
+            yield data
+
+    # reading (and decompression) on a separate thread, at most 4 blocks ahead
+    queue = Queue(4)
+    stop = threading.Event()
+
+    def put(item):
+        # give up once the consumer is gone
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return
+            except Full:
+                pass
+
+    def run():
+        try:
+            while not stop.is_set():
+                data = f.read(chunk_size)
+                put(data)
+                if not data:
+                    return
+        except Exception as e:
+            put(e)
+
+    thread = threading.Thread(target=run, name="tiles-reader")
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            data = queue.get()
+            if isinstance(data, Exception):
+                raise data
+            if not data:
+                return
+            yield data
+    finally:
+        stop.set()
+        # the file is closed by the caller: wait for the pending read, unless it may never return
+        thread.join(DETACH_TIMEOUT if interactive else None)
+
+
+def iter_chunks(filename, columns=3, chunk_size=CHUNK_SIZE, offset=0, threaded=None):
+    """
+        Read an edge stream as a sequence of parsed chunks, along with their position in the stream
+        :param filename: edge stream filename (plain, gzip, bzip2 or xz), "-" for the standard input
+        :param columns: 3 for TILES (u, v, t), 4 for eTILES (action, u, v, t)
+        :param chunk_size: bytes read at a time
+        :param offset: byte offset (of the uncompressed stream) to start from (beginning of a line,
+                       e.g. a previously returned offset)
+        :param threaded: read on a separate thread (default: only compressed files and the standard input)
+        :return: generator of (byte offset following the chunk, column tuple) pairs
+    """
+    f, compressed = open_stream(filename)
+    if threaded is None:
+        threaded = compressed
+
+    try:
+        if offset > 0:
+            if filename == "-":
+                raise IOError("The standard input cannot be read from an offset")
+            f.seek(offset)
+        tail = b""
+        for data in _read_blocks(f, chunk_size, threaded, filename == "-"):
+            offset += len(data)
+            data = tail + data
+            cut = data.rfind(b"\n") + 1
+            tail = data[cut:]
+            if cut > 0:
+                yield offset - len(tail), parse_chunk(data[:cut], columns)
+
+        if tail.strip():
+            yield offset, parse_chunk(tail + b"\n", columns)
+    finally:
+        if filename != "-":
+            f.close()
+
+
+def read_chunks(filename, columns=3, chunk_size=CHUNK_SIZE):
+    """
+        Read an edge stream as a sequence of parsed chunks
+        :param filename: edge stream filename (plain, gzip, bzip2 or xz), "-" for the standard input
+        :param columns: 3 for TILES (u, v, t), 4 for eTILES (action, u, v, t)
+        :param chunk_size: bytes read at a time
+        :return: generator of column tuples
+    """
+    for _, chunk in iter_chunks(filename, columns, chunk_size):
+        yield chunk
+
+
+def to_records(chunk):
+    """
+        Convert a parsed chunk in records
+        :param chunk: column tuple
+        :return: iterator of tuples of python ints
+    """
+    if np is not None:
+        chunk = [c.tolist() for c in chunk]
+    return zip(*chunk)
+
+
+def read_edges(filename, columns=3, chunk_size=CHUNK_SIZE):
+    """
+        Iterate over the records of an edge stream
+        :param filename: edge stream filename (plain, gzip, bzip2 or xz), "-" for the standard input
+        :param columns: 3 for TILES (u, v, t), 4 for eTILES (action, u, v, t)
+        :param chunk_size: bytes read at a time
+        :return: generator of tuples of python ints
+    """
+    for chunk in read_chunks(filename, columns, chunk_size):
+        for record in to_records(chunk):
+            yield record
@@ -0,0 +1,301 @@
+"""
+    Live ingestion service: TILES (or eTILES) fed by a TCP or Unix socket (python 3, asyncio).
+
+    Producers send the interactions with the file format, one per line
+    (u, v, t or action, u, v, t, tab separated), interleaved with commands;
+    every command is answered by a JSON line once the interactions sent
+    before it are processed:
+
+        SNAPSHOT    last completed observation (statistics, communities, merges and splits)
+        METRICS     cumulative metrics, last per-slice record and service backlog
+        SHUTDOWN    close the last observation and the sinks, stop the service
+        QUIT        close the connection
+
+    Malformed lines are skipped and answered by {"error": ..., "line": ...}.
+    Timestamps must be non decreasing across all the connections.
+
+    The algorithm runs on a single worker thread (parsing, ingestion and slice
+    output included), so the event loop never blocks. Blocks of interactions
+    wait in a bounded queue: when the algorithm falls behind the connections
+    stop being read, and TCP flow control slows the producers down (back-pressure).
+"""
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from .reader import parse_chunk, to_records
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+# bytes read from a connection at a time (a block of interactions)
+READ_SIZE = 1 << 16
+
+COMMANDS = ("SNAPSHOT", "METRICS", "SHUTDOWN", "QUIT")
+
+
+def parse_address(address):
+    """
+        Parse a service address
+        :param address: tcp://host:port or unix:path
+        :return: ("tcp", host, port) or ("unix", path)
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    if address.startswith("tcp://"):
+        host, _, port = address[len("tcp://"):].rpartition(":")
+        if host and port.isdigit():
+            return "tcp", host.strip("[]"), int(port)
+    raise ValueError("Invalid address %s (tcp://host:port or unix:path)" % address)
+
+
+class Service(object):
+    """
+        Socket front end of a TILES instance
+    """
+
+    def __init__(self, tl, maxsize=8, window=None):
+        """
+            Constructor
+            :param tl: TILES or eTILES instance (with its sinks)
+            :param maxsize: maximum number of blocks of interactions waiting to be processed
+            :param window: micro-batch window in seconds (optional, see TILES.feed)
+        """
+        self.tl = tl
+        self.maxsize = maxsize
+        self.window = window
+        self.last = None
+        self.address = None
+        self.server = None
+        self.queue = None
+        self.consumer = None
+        self.stopping = False
+        self.stopped = None
+        # open connections
+        self.writers = set()
+        self.executor = ThreadPoolExecutor(1)
+
+    async def start(self, address):
+        """
+            Start listening
+            :param address: tcp://host:port (port 0: any free port) or unix:path
+            :return: the actual address
+        """
+        self.queue = asyncio.Queue(self.maxsize)
+        self.stopped = asyncio.Event()
+        self.consumer = asyncio.ensure_future(self._consume())
+
+        kind = parse_address(address)
+        if kind[0] == "unix":
+            if os.path.exists(kind[1]):
+                os.remove(kind[1])
+            self.server = await asyncio.start_unix_server(self._connection, kind[1])
+            self.address = address
+        else:
+            self.server = await asyncio.start_server(self._connection, kind[1], kind[2])
+            host, port = self.server.sockets[0].getsockname()[:2]
+            self.address = "tcp://%s:%d" % (host, port)
+        return self.address
+
+    async def wait_closed(self):
+        """
+            Wait for a SHUTDOWN command
+        """
+        # cancelling a waiter must not interrupt the processing of the queue
+        await asyncio.shield(self.consumer)
+
+    async def stop(self):
+        """
+            Process the queued interactions, close the algorithm and stop listening
+            :return: the Snapshot of the last observation
+        """
+        if not self.stopping and not self.stopped.is_set():
+            self.stopping = True
+            await self.queue.put(("shutdown", None, None))
+        await self.wait_closed()
+        return self.last
+
+    async def _connection(self, reader, writer):
+        self.writers.add(writer)
+        tail = b""
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data or self.stopped.is_set():
+                    break
+                data = tail + data
+                cut = data.rfind(b"\n") + 1
+                tail = data[cut:]
+                if await self._dispatch(data[:cut], writer):
+                    return
+            if tail.strip() and not self.stopped.is_set():
+                if await self._dispatch(tail + b"\n", writer):
+                    return
+        except ConnectionError:
+            pass
+        if self.stopped.is_set():
+            writer.close()
+        else:
+            # closed by the consumer, once the replies to the queued commands are written
+            await self.queue.put(("close", None, writer))
+
+    async def _dispatch(self, data, writer):
+        """
+            Queue the interactions and the commands of a block of complete lines
+            :return: True if the connection is over (QUIT or SHUTDOWN)
+        """
+        lines = data.splitlines(True)
+        start = 0
+        for i, line in enumerate(lines):
+            command = line.strip().upper()
+            if not command[:1].isalpha():
+                continue
+            if i > start:
+                await self.queue.put(("data", b"".join(lines[start:i]), writer))
+            start = i + 1
+
+            command = command.decode("ascii", "replace")
+            if command == "QUIT":
+                await self.queue.put(("close", None, writer))
+                return True
+            if command == "SHUTDOWN":
+                self.stopping = True
+                await self.queue.put(("shutdown", None, writer))
+                return True
+            await self.queue.put(("command", command, writer))
+        if start < len(lines):
+            await self.queue.put(("data", b"".join(lines[start:]), writer))
+        return False
+
+    async def _consume(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            kind, payload, writer = await self.queue.get()
+            try:
+                if kind == "data":
+                    replies = await loop.run_in_executor(self.executor, self._ingest, payload)
+                elif kind == "command":
+                    replies = await loop.run_in_executor(self.executor, self._command, payload)
+                elif kind == "shutdown":
+                    replies = await loop.run_in_executor(self.executor, self._shutdown)
+                else:
+                    replies = []
+            except Exception as e:
+                replies = [_json({"error": "%s: %s" % (type(e).__name__, e)})]
+            self._reply(writer, replies)
+            if kind == "close":
+                self.writers.discard(writer)
+                writer.close()
+            if kind == "shutdown":
+                break
+
+        self.stopped.set()
+        self.server.close()
+        for writer in self.writers:
+            writer.close()
+        self.writers.clear()
+        # release the connections waiting for a free slot
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        await self.server.wait_closed()
+        self.executor.shutdown()
+
+    @staticmethod
+    def _reply(writer, replies):
+        if writer is None or not replies or writer.transport.is_closing():
+            return
+        writer.write(b"".join(replies))
+
+    # worker thread
+
+    def _ingest(self, data):
+        """
+            Parse and process a block of interactions
+            :return: error replies of the malformed lines
+        """
+        columns = self.tl.columns
+        errors = []
+        try:
+            chunks = [parse_chunk(data, columns)]
+        except (ValueError, IndexError):
+            # recover line by line
+            chunks = []
+            for line in data.splitlines():
+                try:
+                    chunks.append(parse_chunk(line + b"\n", columns))
+                except (ValueError, IndexError) as e:
+                    errors.append(_json({"error": str(e), "line": line.decode("utf-8", "replace")}))
+
+        for chunk in chunks:
+            for snapshot in self.tl.feed(to_records(chunk), self.window):
+                self.last = snapshot
+        return errors
+
+    def _command(self, command):
+        if command == "SNAPSHOT":
+            return [_json(_describe(self.last))]
+        if command == "METRICS":
+            metrics = self.tl.metrics
+            totals = metrics.totals()
+            totals["last"] = metrics.history[-1] if metrics.history else None
+            totals["backlog"] = self.queue.qsize()
+            return [_json(totals)]
+        return [_json({"error": "Unknown command %s (%s)" % (command, ", ".join(COMMANDS))})]
+
+    def _shutdown(self):
+        if self.tl.last_time is not None:
+            self.last = self.tl.close()
+        return [_json(_describe(self.last))]
+
+
+def _json(record):
+    return (json.dumps(record, sort_keys=True) + "\n").encode("utf-8")
+
+
+def _describe(snapshot):
+    """
+        JSON representation of a Snapshot (without its edges)
+    """
+    if snapshot is None:
+        return {"slice": None}
+    record = snapshot.stats()
+    record.update({"start": snapshot.start, "end": snapshot.end, "final": snapshot.final,
+                   "communities": snapshot.communities, "merges": snapshot.merges, "splits": snapshot.splits})
+    return record
+
+
+def serve(tl, address, maxsize=8, window=None):
+    """
+        Run the service until a SHUTDOWN command (or SIGINT/KeyboardInterrupt)
+        :param tl: TILES or eTILES instance (with its sinks)
+        :param address: tcp://host:port or unix:path
+        :param maxsize: maximum number of blocks of interactions waiting to be processed
+        :param window: micro-batch window in seconds (optional, see TILES.feed)
+        :return: the Snapshot of the last observation
+    """
+    service = Service(tl, maxsize, window)
+    loop = asyncio.new_event_loop()
+
+    # Ctrl-C: close the last observation and the sinks with the interactions received so far
+    interrupt = False
+    try:
+        loop.add_signal_handler(signal.SIGINT, lambda: loop.create_task(service.stop()))
+        interrupt = True
+    except (NotImplementedError, RuntimeError, ValueError):
+        # no signal handlers on this platform (or outside the main thread): KeyboardInterrupt
+        pass
+
+    try:
+        loop.run_until_complete(service.start(address))
+        try:
+            loop.run_until_complete(service.wait_closed())
+        except KeyboardInterrupt:
+            loop.run_until_complete(service.stop())
+        return service.last
+    finally:
+        if interrupt:
+            loop.remove_signal_handler(signal.SIGINT)
+        loop.close()
@@ -0,0 +1,365 @@
+"""
+    Snapshot sinks: destinations of the observations produced by TILES.
+
+    A sink exposes write(snapshot), called at the end of every observation,
+    and close(), called once the stream is over.
+"""
+import bz2
+import gzip
+import io
+import time
+import os
+import threading
+from collections import deque
+from future.utils import iteritems
+
+try:
+    import lzma
+except ImportError:  # pragma: no cover
+    lzma = None
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # pragma: no cover
+    ThreadPoolExecutor = None
+
+import sys
+if sys.version_info > (2, 7):
+    from queue import Queue
+else:
+    from Queue import Queue
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+
+# codec -> (file extension, default compression level)
+CODECS = {"gzip": (".gz", 3), "bz2": (".bz2", 9), "xz": (".xz", 6), "none": ("", None)}
+
+# uncompressed size of the blocks compressed in parallel
+BLOCK_SIZE = 1 << 22
+
+# suffix of the files being written (renamed once complete)
+PARTIAL = ".part"
+
+
+def _now():
+    return str(time.asctime(time.localtime(time.time())))
+
+
+def _write_lines(out, lines, batch=50000):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) == batch:
+            out.write(u"".join(buffer))
+            buffer = []
+    out.write(u"".join(buffer))
+
+
+def _blocks(lines):
+    """
+        Encode lines in blocks of about BLOCK_SIZE bytes (at least one block, possibly empty)
+    """
+    size = BLOCK_SIZE
+    buffer = []
+    length = 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield u"".join(buffer).encode("utf-8")
+            buffer = []
+            length = 0
+    if buffer or length == 0:
+        yield u"".join(buffer).encode("utf-8")
+
+
+def _compress(codec, level, data):
+    """
+        Compress a block as a standalone stream: gzip, bz2 and xz readers decode concatenated streams
+    """
+    if codec == "gzip":
+        return gzip.compress(data, level)
+    if codec == "bz2":
+        return bz2.compress(data, level)
+    if codec == "xz":
+        return lzma.compress(data, preset=level)
+    return data
+
+
+def _remove(fname):
+    try:
+        os.remove(fname)
+    except OSError:
+        pass
+
+
+def _complete(fname):
+    """
+        Rename a fully written file to its final name
+    """
+    final = fname[:-len(PARTIAL)]
+    if hasattr(os, "replace"):
+        os.replace(fname, final)
+    else:
+        os.rename(fname, final)
+
+
+def _open_text(fname, codec, level):
+    if codec == "gzip":
+        return gzip.open(fname, "wt", level)
+    if codec == "bz2":
+        return bz2.open(fname, "wt", level)
+    if codec == "xz":
+        return lzma.open(fname, "wt", preset=level)
+    return io.open(fname, "w")
+
+
+class FileSink(object):
+    """
+        Write every observation as compressed text files (strong-communities, graph, merging
+        and splitting) and log the progress in extraction_status.txt.
+
+        With more than one thread the files of an observation are compressed concurrently,
+        in blocks of BLOCK_SIZE bytes: each block is a standalone compressed stream and a
+        file is the concatenation of its blocks (still readable by gzip.open, zcat, etc.).
+        Formatting the lines stays on the calling thread; zlib, bz2 and lzma release the
+        GIL while compressing.
+    """
+
+    def __init__(self, path="", base=None, codec="gzip", level=None, threads=1, keep_open=True):
+        """
+            Constructor
+            :param path: folder for the output files
+            :param base: folder path is relative to (default: current working directory)
+            :param codec: output compression, gzip (.gz), bz2 (.bz2), xz (.xz) or none (no extension)
+            :param level: compression level (default: 3 for gzip, 9 for bz2, 6 for xz)
+            :param threads: compression threads (1: files compressed one after another by the calling thread)
+            :param keep_open: keep extraction_status.txt open between two writes (False: reopen it every time,
+                              e.g. when many sinks are active at once)
+        """
+        if codec not in CODECS:
+            raise ValueError("Unknown codec %s (gzip, bz2, xz or none)" % codec)
+        if codec == "xz" and lzma is None:
+            raise ImportError("The xz codec requires the lzma module")
+        if base is None:
+            base = os.getcwd()
+        self.folder = os.path.join(base, path)
+        self.codec = codec
+        self.level = CODECS[codec][1] if level is None else level
+        self.threads = threads if ThreadPoolExecutor is not None else 1
+        self.keep_open = keep_open
+        self.pool = None
+        self.status = None
+        # length of extraction_status.txt when the sink was checkpointed
+        self.offset = None
+
+    def _write_file(self, name, slice_id, lines, pending):
+        """
+            Write an observation file: directly, or queueing its compressed blocks in pending
+        """
+        # written under a temporary name: a failure never leaves a truncated file that looks complete
+        fname = os.path.join(self.folder, "%s-%d%s%s" % (name, slice_id, CODECS[self.codec][0], PARTIAL))
+        if self.threads <= 1:
+            try:
+                with _open_text(fname, self.codec, self.level) as out:
+                    _write_lines(out, lines)
+            except BaseException:
+                _remove(fname)
+                raise
+            _complete(fname)
+            return
+
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(self.threads)
+        out = io.open(fname, "wb")
+        try:
+            for block in _blocks(lines):
+                pending.append((out, self.pool.submit(_compress, self.codec, self.level, block)))
+                # bound the memory held by the blocks waiting to be compressed
+                while len(pending) > 2 * self.threads:
+                    self._drain(pending, 1)
+        except BaseException:
+            out.close()
+            _remove(fname)
+            raise
+        pending.append((out, None))
+
+    @staticmethod
+    def _drain(pending, n=None):
+        """
+            Write the oldest n queued blocks (all if n is None), in submission order
+        """
+        while pending and (n is None or n > 0):
+            out, future = pending.popleft()
+            if future is None:
+                out.close()
+                _complete(out.name)
+            else:
+                out.write(future.result())
+                if n is not None:
+                    n -= 1
+
+    @staticmethod
+    def _discard(pending):
+        """
+            Drop the queued blocks and the files they belong to
+        """
+        while pending:
+            out, future = pending.popleft()
+            if future is not None:
+                future.cancel()
+            out.close()
+            _remove(out.name)
+
+    def log(self, message):
+        """
+            Append a line to extraction_status.txt
+            :param message: text to log
+        """
+        if self.status is None:
+            fname = os.path.join(self.folder, "extraction_status.txt")
+            if self.offset is None:
+                self.status = open(fname, "w")
+                self.status.write(u"Started! (%s) \n\n" % _now())
+            else:
+                # resumed from a checkpoint: discard what was logged after it
+                self.status = open(fname, "r+")
+                self.status.seek(self.offset)
+                self.status.truncate()
+                self.offset = None
+        self.status.write(message)
+        self.status.flush()
+        if not self.keep_open:
+            self.offset = self.status.tell()
+            self.status.close()
+            self.status = None
+
+    def write(self, snapshot):
+        """
+            Write the observation files
+            :param snapshot: Snapshot
+        """
+        if snapshot.final:
+            self.log(u"Slice %s: Starting %s ending %s - (%s)\n" %
+                     (snapshot.slice, snapshot.start_date, snapshot.end_date, _now()))
+        else:
+            self.log(u"Saving Slice %s: Starting %s ending %s - (%s)\n" %
+                     (snapshot.slice, snapshot.start_date, snapshot.end_date, _now()))
+        self.log(u"Edge Added: %d\tEdge removed: %d\n" % (snapshot.added, snapshot.removed))
+
+        # compressed blocks waiting to be written (threads > 1)
+        pending = deque()
+        try:
+            if not snapshot.final:
+                self._write_file("splitting", snapshot.slice,
+                                 (u"%s\t%s\n" % (c, str(new_ids)) for c, new_ids in snapshot.splits), pending)
+
+            self.log(u"Writing Communities (%s)\n" % _now())
+            self._write_file("strong-communities", snapshot.slice,
+                             (u"%d\t%s\n" % (idk, str(nodes)) for idk, nodes in iteritems(snapshot.communities)),
+                             pending)
+
+            self.log(u"Writing actual graph status (%s)\n" % _now())
+            self._write_file("graph", snapshot.slice, (u"%d\t%s\t%d\n" % e for e in snapshot.edges), pending)
+
+            self.log(u"Writing merging file (%s)\n" % _now())
+            self._write_file("merging", snapshot.slice,
+                             (u"%d\t%s\n" % (k, str(merged)) for k, merged in iteritems(snapshot.merges)), pending)
+            self._drain(pending)
+        except BaseException:
+            self._discard(pending)
+            raise
+
+        merged = sum(len(m) for m in snapshot.merges.values())
+        self.log(u"Merged communities: %d (%s)\n" % (merged, _now()))
+        self.log(u"Total Communities %d (%s)\n" % (len(snapshot.communities), _now()))
+        if not snapshot.final:
+            self.log(u"\nStarted Slice %s (%s)\n" % (snapshot.slice + 1, _now()))
+
+    def close(self):
+        self.log(u"Finished! (%s)" % _now())
+        if self.status is not None:
+            self.status.close()
+            self.status = None
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.status is not None:
+            state["offset"] = self.status.tell()
+        state["status"] = None
+        state["pool"] = None
+        return state
+
+
+class ThreadedSink(object):
+    """
+        Run a sink on a background writer thread.
+
+        Snapshots are frozen copies, so serialization and compression can proceed
+        while the algorithm ingests the next observation. At most maxsize snapshots
+        wait to be written: when the writer falls behind, write() blocks (back-pressure).
+    """
+
+    def __init__(self, sink, maxsize=2):
+        """
+            Constructor
+            :param sink: the wrapped sink
+            :param maxsize: maximum number of snapshots waiting to be written
+        """
+        self.sink = sink
+        self.maxsize = maxsize
+        self.queue = Queue(maxsize)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="tiles-writer")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            snapshot = self.queue.get()
+            try:
+                if snapshot is None:
+                    return
+                if self.error is None:
+                    self.sink.write(snapshot)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _check(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def write(self, snapshot):
+        self._check()
+        self.queue.put(snapshot)
+
+    def flush(self):
+        """
+            Wait until all the queued snapshots are written
+        """
+        self.queue.join()
+        self._check()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self._check()
+        self.sink.close()
+
+    def __getstate__(self):
+        # checkpoint the wrapped sink once the queued snapshots are written
+        self.flush()
+        return {"sink": self.sink, "maxsize": self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(state["sink"], state["maxsize"])
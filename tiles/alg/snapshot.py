@@ -0,0 +1,71 @@
+"""
+    Observation snapshots produced by TILES.
+"""
+import datetime
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+
+class Snapshot(object):
+    """
+        Status of the communities and of the graph at the end of an observation window.
+        The snapshot is a frozen copy: it is not affected by the subsequent stream.
+    """
+
+    def __init__(self, slice_id, start, end, communities, merges, splits, edges, nodes,
+                 added=0, removed=0, final=False):
+        """
+            Constructor
+            :param slice_id: observation identifier
+            :param start: first timestamp of the observation (epoch seconds)
+            :param end: last timestamp of the observation (epoch seconds)
+            :param communities: community id -> sorted list of nodes
+            :param merges: surviving community id -> list of merged community ids
+            :param splits: list of (community id, list of community ids generated by its split)
+            :param edges: list of (u, v, weight) triples
+            :param nodes: number of nodes in the graph
+            :param added: number of interactions read in the observation
+            :param removed: number of interactions expired/removed in the observation
+            :param final: True for the last (possibly partial) observation
+        """
+        self.slice = slice_id
+        self.start = start
+        self.end = end
+        self.communities = communities
+        self.merges = merges
+        self.splits = splits
+        self.edges = edges
+        self.nodes = nodes
+        self.added = added
+        self.removed = removed
+        self.final = final
+        # operational metrics of the observation (see metrics.Metrics.record), set by TILES once written
+        self.metrics = None
+
+    @property
+    def start_date(self):
+        if self.start is None:
+            return None
+        return datetime.datetime.fromtimestamp(self.start)
+
+    @property
+    def end_date(self):
+        if self.end is None:
+            return None
+        return datetime.datetime.fromtimestamp(self.end)
+
+    def stats(self):
+        """
+            Graph and community statistics of the observation
+            :return: dictionary
+        """
+        return {"slice": self.slice, "nodes": self.nodes, "edges": len(self.edges),
+                "communities": len(self.communities), "merged": sum(len(m) for m in self.merges.values()),
+                "splits": len(self.splits), "added": self.added, "removed": self.removed}
+
+    def __repr__(self):
+        return "Snapshot(slice=%d, communities=%d, edges=%d)" % (self.slice, len(self.communities),
+                                                                 len(self.edges))
@@ -0,0 +1,199 @@
+"""
+    Parameter sweeps: run TILES on the same stream for a grid of (ttl, obs) configurations.
+
+    The input is parsed once into int64 columns held in shared memory blocks
+    (multiprocessing.shared_memory, python >= 3.8 with numpy), filled chunk by
+    chunk as the input is read: the worker processes map the blocks without
+    copying them and every configuration writes its results in its own folder
+    (path/ttl-<ttl>_obs-<obs>). Without shared memory support each worker parses
+    the input by itself.
+"""
+import multiprocessing
+import os
+import time
+from .TILES import TILES
+from .eTILES import eTILES
+from .reader import read_chunks, read_edges
+from .sinks import FileSink, ThreadedSink
+from .metrics import Metrics
+from .events import EventLog
+
+try:
+    import numpy as np
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover
+    np = None
+    shared_memory = None
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+# records converted to python ints at a time by the workers
+BATCH = 1 << 16
+
+# records per shared memory block (the pages of the last, partially filled, block are never touched)
+SEGMENT = 1 << 20
+
+
+def grid(ttls, observations):
+    """
+        Cartesian product of the parameter values
+        :param ttls: edge time to live values (days)
+        :param observations: observation window values (days)
+        :return: list of configurations ({"ttl": ttl, "obs": obs})
+    """
+    return [{"ttl": ttl, "obs": obs} for ttl in ttls for obs in observations]
+
+
+def config_name(config):
+    """
+        Output folder name of a configuration
+        :param config: {"ttl": ttl, "obs": obs} (ttl is ignored by eTILES)
+    """
+    return "ttl-%g_obs-%g" % (config.get("ttl", float('inf')), config["obs"])
+
+
+class SharedStream(object):
+    """
+        An edge stream parsed in shared memory blocks of int64 columns (columns x SEGMENT records each).
+        Every parsed chunk is copied in the blocks and released before the next one is read.
+    """
+
+    def __init__(self, filename, columns=3):
+        """
+            Constructor
+            :param filename: edge stream filename
+            :param columns: 3 for TILES (u, v, t), 4 for eTILES (action, u, v, t)
+        """
+        self.columns = columns
+        self.segment = SEGMENT
+        self.segments = []
+        # (block name, records) of each block
+        self.blocks = []
+
+        data = None
+        size = self.segment
+        try:
+            for chunk in read_chunks(filename, columns):
+                n = len(chunk[0])
+                i = 0
+                while i < n:
+                    if size == self.segment:
+                        # the view must be released before its block is unmapped
+                        data = None
+                        data = self._grow()
+                        size = 0
+                    k = min(n - i, self.segment - size)
+                    for c in range(columns):
+                        data[c, size:size + k] = chunk[c][i:i + k]
+                    size += k
+                    i += k
+                    self.blocks[-1] = (self.blocks[-1][0], size)
+        except BaseException:
+            data = None
+            self.close()
+            raise
+        data = None
+        if self.segments:
+            # the workers map the blocks by name: the creator mapping is not needed anymore
+            self.segments[-1].close()
+
+    def _grow(self):
+        """
+            Start a new block
+            :return: view of the new block
+        """
+        if self.segments:
+            self.segments[-1].close()
+        shm = shared_memory.SharedMemory(create=True, size=8 * self.columns * self.segment)
+        self.segments.append(shm)
+        self.blocks.append((shm.name, 0))
+        return np.ndarray((self.columns, self.segment), dtype=np.int64, buffer=shm.buf)
+
+    def close(self):
+        """
+            Release the shared memory blocks
+        """
+        for shm in self.segments:
+            shm.close()
+            shm.unlink()
+        self.segments = []
+
+
+def _records(blocks, segment, columns):
+    """
+        Records of the shared memory blocks, mapped one at a time
+    """
+    for name, size in blocks:
+        shm = shared_memory.SharedMemory(name=name)
+        data = np.ndarray((columns, segment), dtype=np.int64, buffer=shm.buf)
+        try:
+            for i in range(0, size, BATCH):
+                for record in zip(*data[:, i:min(i + BATCH, size)].tolist()):
+                    yield record
+        finally:
+            # the view must be released before the block is unmapped
+            data = None
+            shm.close()
+
+
+def _run(job):
+    source, explicit, config, folder, window, background, events, params = job
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    metrics = Metrics(os.path.join(folder, "metrics.jsonl"))
+    log = EventLog(os.path.join(folder, "events.jsonl")) if events else None
+    if explicit:
+        tl = eTILES(obs=config["obs"], metrics=metrics, events=log, **params)
+    else:
+        tl = TILES(ttl=config.get("ttl", float('inf')), obs=config["obs"], metrics=metrics, events=log, **params)
+    sink = FileSink(folder, codec=tl.codec, level=tl.level, threads=tl.compress_threads)
+    tl.sinks.append(ThreadedSink(sink) if background else sink)
+
+    start = time.time()
+    if isinstance(source, tuple):
+        records = _records(source[0], source[1], tl.columns)
+    else:
+        records = read_edges(source, tl.columns)
+    for _ in tl.feed(records, window):
+        pass
+    tl.close()
+
+    return {"config": config, "path": folder, "slices": tl.actual_slice, "seconds": time.time() - start}
+
+
+def sweep(filename, configs, path="", explicit=False, processes=None, window=None, background=False,
+          events=False, **params):
+    """
+        Run TILES (or eTILES) for each configuration on a process pool
+        :param filename: edge stream filename
+        :param configs: list of configurations ({"ttl": ttl, "obs": obs}, see grid)
+        :param path: folder for the configuration folders
+        :param explicit: run eTILES (explicit removal) instead of TILES
+        :param processes: number of worker processes (default: number of cores)
+        :param window: micro-batch window in seconds (optional, see TILES.feed)
+        :param background: write the observation files on a background thread (see ThreadedSink)
+        :param events: log the community lifecycle events in the events.jsonl file of each configuration
+        :param params: TILES/eTILES parameters shared by the configurations (gc, approx, codec, level,
+                       compress_threads, ...)
+        :return: list of run summaries (configuration, output folder, number of slices, seconds), in configs order
+    """
+    stream = None
+    source = filename
+    if shared_memory is not None and np is not None:
+        stream = SharedStream(filename, 4 if explicit else 3)
+        source = (stream.blocks, stream.segment)
+
+    jobs = [(source, explicit, config, os.path.abspath(os.path.join(path, config_name(config))), window,
+             background, events, params) for config in configs]
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(_run, jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+        if stream is not None:
+            stream.close()
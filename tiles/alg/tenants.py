@@ -0,0 +1,173 @@
+"""
+    Multi-tenant runner: many independent TILES (or eTILES) streams hosted by a pool of worker processes.
+
+    The input interleaves the records of all the tenants, each prefixed by a
+    tenant key column:
+
+        tenant  u  v  t              (TILES)
+        tenant  action  u  v  t      (eTILES)
+
+    Every tenant is assigned to a worker by a stable hash of its key; the
+    worker hosts the algorithm states of its tenants and writes the slices of
+    each one in its own folder (path/<tenant>), so the records of a tenant are
+    processed in input order. The main process only routes the raw lines, the
+    workers parse them. Workers hold no open file between two observations of
+    a tenant (see FileSink keep_open), so thousands of tenants fit in a process.
+"""
+import multiprocessing
+import os
+import re
+import sys
+import zlib
+from .TILES import TILES
+from .eTILES import eTILES
+from .reader import open_stream, parse_chunk, to_records
+from .sinks import FileSink
+from .metrics import Metrics
+
+if sys.version_info > (2, 7):
+    from queue import Full
+else:
+    from Queue import Full
+
+__author__ = "Giulio Rossetti"
+__contact__ = "giulio.rossetti@gmail.com"
+__website__ = "about.giuliorossetti.net"
+__license__ = "BSD"
+
+# lines sent to a worker at a time
+BATCH = 1 << 13
+
+# blocks waiting in the queue of a worker (back-pressure on the reader)
+QUEUE_SIZE = 8
+
+_VALID = re.compile(r"^[A-Za-z0-9_.@=+-]+$")
+
+
+def worker_of(tenant, workers):
+    """
+        Worker hosting a tenant (stable across processes and runs)
+        :param tenant: tenant key (bytes)
+        :param workers: number of workers
+    """
+    return zlib.crc32(tenant) % workers
+
+
+def _check(tenant):
+    name = tenant.decode("utf-8", "replace")
+    if not _VALID.match(name) or name in (".", ".."):
+        raise ValueError("Invalid tenant key %r: letters, digits and _.@=+- only (used as folder name)" % name)
+    return name
+
+
+def _worker(queue, results, path, explicit, params, window):
+    tenants = {}
+    try:
+        while True:
+            block = queue.get()
+            if block is None:
+                break
+
+            # group the lines by tenant (input order is preserved within a tenant)
+            lines = {}
+            for tenant, line in block:
+                group = lines.get(tenant)
+                if group is None:
+                    lines[tenant] = [line]
+                else:
+                    group.append(line)
+
+            for tenant, group in lines.items():
+                tl = tenants.get(tenant)
+                if tl is None:
+                    folder = os.path.join(path, tenant)
+                    if not os.path.exists(folder):
+                        os.makedirs(folder)
+                    sinks = [FileSink(folder, keep_open=False)]
+                    metrics = Metrics(os.path.join(folder, "metrics.jsonl"))
+                    cls = eTILES if explicit else TILES
+                    tl = tenants[tenant] = cls(path=folder, sinks=sinks, metrics=metrics, **params)
+                for _ in tl.feed(to_records(parse_chunk(b"".join(group), tl.columns)), window):
+                    pass
+
+        summary = {}
+        for tenant, tl in tenants.items():
+            tl.close()
+            summary[tenant] = {"path": os.path.join(path, tenant), "slices": tl.actual_slice,
+                               "interactions": tl.metrics.counters.get("interactions", 0)}
+        results.put((None, summary))
+    except Exception as e:
+        results.put(("%s: %s" % (type(e).__name__, e), None))
+
+
+def run_tenants(filename, path="", explicit=False, processes=None, window=None, **params):
+    """
+        Run one TILES (or eTILES) instance per tenant of an interleaved stream
+        :param filename: edge stream with a leading tenant key column (plain, gzip, bzip2 or xz), "-" for stdin
+        :param path: folder for the tenant folders
+        :param explicit: run eTILES (explicit removal) instead of TILES
+        :param processes: number of worker processes (default: number of cores)
+        :param window: micro-batch window in seconds (optional, see TILES.feed)
+        :param params: TILES/eTILES parameters shared by the tenants (obs, ttl, gc, ...)
+        :return: dictionary tenant -> summary (output folder, number of slices, interactions)
+    """
+    processes = processes or multiprocessing.cpu_count()
+    path = os.path.abspath(path)
+    queues = [multiprocessing.Queue(QUEUE_SIZE) for _ in range(processes)]
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_worker, args=(q, results, path, explicit, params, window),
+                                       name="tiles-tenants-%d" % i) for i, q in enumerate(queues)]
+    for w in workers:
+        w.daemon = True
+        w.start()
+
+    def send(i, block):
+        while True:
+            try:
+                queues[i].put(block, timeout=1)
+                return
+            except Full:
+                if not workers[i].is_alive():
+                    raise RuntimeError("Tenant worker %d died" % i)
+
+    names = {}
+    buffers = [[] for _ in range(processes)]
+    f, _ = open_stream(filename)
+    try:
+        for line in f:
+            key, sep, record = line.partition(b"\t")
+            if not sep or not record.strip():
+                continue
+            tenant = names.get(key)
+            if tenant is None:
+                tenant = names[key] = _check(key)
+            i = worker_of(key, processes)
+            buffers[i].append((tenant, record))
+            if len(buffers[i]) >= BATCH:
+                send(i, buffers[i])
+                buffers[i] = []
+        for i, buffer in enumerate(buffers):
+            if buffer:
+                send(i, buffer)
+            send(i, None)
+    except BaseException:
+        for w in workers:
+            w.terminate()
+        raise
+    finally:
+        if filename != "-":
+            f.close()
+
+    summary = {}
+    errors = []
+    for _ in workers:
+        error, tenants = results.get()
+        if error is not None:
+            errors.append(error)
+        else:
+            summary.update(tenants)
+    for w in workers:
+        w.join()
+    if errors:
+        raise RuntimeError("Tenant workers failed: %s" % "; ".join(errors))
+    return summary
@@ -0,0 +1,85 @@
+import unittest
+import tiles as t
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+
+class _Crash(object):
+    """
+        Sink simulating a failure of the process at the end of an observation
+    """
+    at = None
+
+    def write(self, snapshot):
+        if snapshot.slice == _Crash.at:
+            raise RuntimeError("crash")
+
+    def close(self):
+        pass
+
+
+def _outputs(folder):
+    res = {}
+    for name in os.listdir(folder):
+        if name.endswith(".gz"):
+            with gzip.open(os.path.join(folder, name), "rt") as f:
+                res[name] = f.read()
+        elif name == "metrics.jsonl":
+            with open(os.path.join(folder, name)) as f:
+                res[name] = [(r["slice"], r["counters"], r["gauges"]) for r in map(json.loads, f)]
+        elif name == "extraction_status.txt":
+            with open(os.path.join(folder, name)) as f:
+                res[name] = len(f.readlines())
+    return res
+
+
+class CheckpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.base = os.path.dirname(os.path.abspath(__file__))
+        self.out = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.out)
+        _Crash.at = None
+
+    def _resume(self, build, sinks):
+        full = os.path.join(self.out, "full")
+        resumed = os.path.join(self.out, "resumed")
+        checkpoint = os.path.join(self.out, "state.ckp")
+        os.makedirs(full)
+        os.makedirs(resumed)
+
+        build(full, sinks(full)).execute()
+
+        tl = build(resumed, sinks(resumed) + [_Crash()])
+        tl.chunk_size = 1 << 16
+        _Crash.at = 5
+        self.assertRaises(RuntimeError, tl.execute, checkpoint, 0)
+        self.assertTrue(os.path.exists(checkpoint))
+
+        _Crash.at = None
+        tl = t.TILES.load_checkpoint(checkpoint)
+        self.assertGreater(tl.offset, 0)
+        self.assertLessEqual(tl.actual_slice, 5)
+        tl.execute(checkpoint, 0)
+        self.assertFalse(os.path.exists(checkpoint))
+
+        self.assertEqual(_outputs(full), _outputs(resumed))
+
+    def test_resume(self):
+        self._resume(lambda path, sinks: t.TILES(filename="%s/gen_simple.tsv" % self.base, obs=30, ttl=90,
+                                                 path=path, sinks=sinks),
+                     lambda path: [t.FileSink(path)])
+
+    def test_resume_explicit(self):
+        self._resume(lambda path, sinks: t.eTILES(filename="%s/sample_net_etiles.tsv" % self.base, obs=1,
+                                                  path=path, sinks=sinks),
+                     lambda path: [t.ThreadedSink(t.DeltaSink(path, keyframe=3))])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import tiles as t
+import shutil
+import os
+
+
+class _Collect(object):
+
+    def __init__(self):
+        self.snapshots = []
+
+    def write(self, snapshot):
+        self.snapshots.append(snapshot)
+
+    def close(self):
+        pass
+
+
+class ColumnarTestCase(unittest.TestCase):
+
+    def test_columnar_roundtrip(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        os.makedirs("cores")
+        collect = _Collect()
+        tl = t.TILES(filename="%s/gen_simple.tsv" % base, obs=30, ttl=90, path="cores",
+                     sinks=[t.ColumnarSink("cores"), collect])
+        tl.execute()
+
+        self.assertEqual(len(collect.snapshots), 34)
+        for snapshot in collect.snapshots:
+            s = t.load_columnar("cores", snapshot.slice)
+            self.assertEqual(s.slice, snapshot.slice)
+            self.assertEqual(len(s), len(snapshot.communities))
+            self.assertEqual(dict((cid, m.tolist()) for cid, m in s.communities()), snapshot.communities)
+            self.assertEqual(s.edges.shape, (3, len(snapshot.edges)))
+
+            loaded = s.to_snapshot()
+            self.assertEqual(loaded.edges, snapshot.edges)
+            self.assertEqual(loaded.merges, snapshot.merges)
+            self.assertEqual(loaded.splits, snapshot.splits)
+            self.assertEqual(loaded.final, snapshot.final)
+
+        shutil.rmtree("cores")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import tiles as t
+import shutil
+import gzip
+import json
+import glob
+import os
+
+
+class DeltaTestCase(unittest.TestCase):
+
+    def test_delta_roundtrip(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        os.makedirs("dres")
+        tl = t.TILES(filename="%s/gen_simple.tsv" % base, obs=30, ttl=90, path="dres",
+                     sinks=[t.FileSink("dres"), t.DeltaSink("dres", keyframe=5)])
+        tl.execute()
+
+        self.assertEqual(len(glob.glob("dres/keyframe-*")), 7)
+        self.assertEqual(len(glob.glob("dres/delta-*")), 27)
+
+        snapshots = list(t.read_delta("dres"))
+        self.assertEqual(len(snapshots), 34)
+        self.assertTrue(snapshots[-1].final)
+
+        for snapshot in snapshots:
+            with gzip.open("dres/strong-communities-%d.gz" % snapshot.slice, "rt") as f:
+                coms = dict((int(l.split("\t")[0]), json.loads(l.split("\t")[1])) for l in f)
+            self.assertEqual(snapshot.communities, coms)
+
+            with gzip.open("dres/graph-%d.gz" % snapshot.slice, "rt") as f:
+                edges = sorted(tuple(map(int, l.split("\t"))) for l in f)
+            self.assertEqual(sorted(snapshot.edges), edges)
+
+        # random access through the closest keyframe
+        snapshot = t.read_delta("dres", 13)
+        self.assertEqual(snapshot.communities, snapshots[13].communities)
+        self.assertEqual(sorted(snapshot.edges), sorted(snapshots[13].edges))
+
+        shutil.rmtree("dres")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import tiles as t
+import os
+import shutil
+import tempfile
+from tiles.alg.reader import read_edges
+
+
+class EventsTestCase(unittest.TestCase):
+
+    def check_replay(self, tl, edges):
+        received = []
+        tl.events = t.EventLog(callback=received.append)
+        snapshots = list(tl.feed(edges))
+        snapshots.append(tl.close())
+
+        kinds = set(e["event"] for e in received)
+        self.assertTrue(set(["birth", "growth", "shrink", "death"]) <= kinds)
+        for s in snapshots:
+            # state at the end of the observation: replay of its events and of the previous ones
+            state = t.replay(e for e in received if e["slice"] <= s.slice)
+            self.assertEqual(dict((k, sorted(v)) for k, v in state.items()), s.communities)
+        for e in received:
+            if e["event"] == "merge":
+                self.assertLess(e["community"], min(e["communities"]))
+        return received
+
+    def test_tiles(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        self.check_replay(t.TILES(obs=1, ttl=2), read_edges("%s/sample_net_tiles.tsv" % base))
+        received = self.check_replay(t.TILES(obs=30, ttl=90), read_edges("%s/gen_simple.tsv" % base))
+        self.assertIn("split", set(e["event"] for e in received))
+
+    def test_etiles(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        self.check_replay(t.eTILES(obs=1), read_edges("%s/sample_net_etiles.tsv" % base, 4))
+
+    def test_log(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        out = tempfile.mkdtemp()
+        try:
+            received = []
+            events = t.EventLog(os.path.join(out, "events.jsonl"), callback=received.append)
+            tl = t.TILES(filename="%s/sample_net_tiles.tsv" % base, obs=1, path=out, events=events)
+            tl.execute()
+            self.assertEqual(list(t.read_events(os.path.join(out, "events.jsonl"))), received)
+            self.assertEqual(events.count, len(received))
+            times = [e["time"] for e in received]
+            self.assertEqual(times, sorted(times))
+        finally:
+            shutil.rmtree(out)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from tiles.alg.expiry import ExpiryWheel, DAY
+
+
+class ExpiryTestCase(unittest.TestCase):
+
+    def test_expiry_wheel(self):
+        qr = ExpiryWheel(2)
+        qr.push(0, 1, 2)
+        qr.push(10, 2, 3)
+        qr.push(DAY + 5, 3, 4)
+        self.assertEqual(len(qr), 3)
+        self.assertEqual(qr.peek(), (0, 1, 2, 1))
+
+        # nothing expires before ttl whole days
+        self.assertEqual(list(qr.expired(2 * DAY - 1)), [])
+
+        # partially expired day
+        self.assertEqual(list(qr.expired(2 * DAY + 5)), [(1, 2, 1)])
+        self.assertEqual(len(qr), 2)
+
+        # whole day released at once, later ones kept
+        self.assertEqual(list(qr.expired(3 * DAY + 4)), [(2, 3, 1)])
+        self.assertEqual(qr.peek(), (DAY + 5, 3, 4, 1))
+        self.assertEqual(list(qr.expired(10 * DAY)), [(3, 4, 1)])
+        self.assertIsNone(qr.peek())
+        self.assertEqual(len(qr), 0)
+
+    def test_counts(self):
+        qr = ExpiryWheel(1)
+        qr.push(0, 1, 2, 3)
+        qr.push(5, 2, 3)
+        self.assertEqual(len(qr), 4)
+        self.assertEqual(list(qr.expired(DAY + 5)), [(1, 2, 3), (2, 3, 1)])
+        self.assertEqual(len(qr), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import tiles as t
+from tiles.alg.reader import read_edges
+import networkx as nx
+import shutil
+import gzip
+import glob
+import os
+
+
+class GraphTestCase(unittest.TestCase):
+
+    def test_compact_graph(self):
+        g = t.CompactGraph()
+        g.add_edge(1, 2)
+        g.add_edge(2, 3, 2)
+        g.add_node(4)
+
+        self.assertEqual(g.number_of_nodes(), 4)
+        self.assertEqual(g.number_of_edges(), 2)
+        self.assertTrue(g.has_edge(2, 1))
+        self.assertEqual(g.weight(3, 2), 2)
+        self.assertEqual(g.degree(2), 2)
+        self.assertEqual(list(g.edges()), [(1, 2, 1), (2, 3, 2)])
+
+        g.add_edge(5, 6)
+        components = list(g.connected_components([1, 2, 3, 4, 5, 6]))
+        self.assertEqual(sorted(map(sorted, components)), [[1, 2, 3], [4], [5, 6]])
+
+        g.remove_edge(1, 2)
+        self.assertFalse(g.has_edge(1, 2))
+        self.assertEqual(g.number_of_edges(), 2)
+
+        g.remove_node(1)
+        self.assertFalse(g.has_node(1))
+        self.assertFalse(g.has_edge(1, 2))
+        self.assertEqual(g.number_of_nodes(), 5)
+
+    def test_gc(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        runs = []
+        for gc, g in [(False, None), (True, None), (True, nx.Graph())]:
+            tl = t.TILES(obs=7, ttl=7, g=g, gc=gc)
+            snapshots = list(tl.feed(read_edges("%s/gen_simple.tsv" % base))) + [tl.close()]
+            for com in tl.communities.values():
+                self.assertTrue(all(n in tl.g for n in com))
+            runs.append((tl, [s.communities for s in snapshots]))
+
+        self.assertEqual(runs[0][1], runs[1][1])
+        self.assertEqual(runs[1][1], runs[2][1])
+        self.assertLess(runs[1][0].g.number_of_nodes(), runs[0][0].g.number_of_nodes() / 10)
+        self.assertEqual(runs[1][0].g.number_of_nodes(), runs[2][0].g.number_of_nodes())
+
+    def test_triangles(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        tl = t.TILES(obs=30, ttl=90)
+        for _ in tl.feed(read_edges("%s/gen_simple.tsv" % base)):
+            g = nx.Graph()
+            g.add_nodes_from(tl.g.nodes())
+            g.add_edges_from((u, v) for u, v, _ in tl.g.edges())
+            expected = nx.triangles(g)
+            for u in tl.g.nodes():
+                self.assertEqual(tl.g.triangles(u), expected[u])
+
+    def test_backends_equivalence(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        for path, g in [("cres", None), ("nres", nx.Graph())]:
+            os.makedirs(path)
+            tl = t.TILES(filename="%s/sample_net_tiles.tsv" % base, g=g, obs=1, path=path, ttl=2)
+            tl.execute()
+
+        for fname in glob.glob("cres/*.gz"):
+            with gzip.open(fname, "rt") as f:
+                compact = f.read()
+            with gzip.open(fname.replace("cres", "nres"), "rt") as f:
+                networkx = f.read()
+            self.assertEqual(compact, networkx)
+
+        shutil.rmtree("cres")
+        shutil.rmtree("nres")
+
+
+if __name__ == '__main__':
+    unittest.main()
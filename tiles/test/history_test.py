@@ -0,0 +1,114 @@
+import unittest
+import tiles as t
+import os
+import pickle
+import shutil
+import tempfile
+from tiles.alg.reader import read_edges
+
+
+class HistoryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.out = tempfile.mkdtemp()
+        self.db = os.path.join(self.out, "history.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.out)
+
+    def run_tiles(self, sinks):
+        base = os.path.dirname(os.path.abspath(__file__))
+        tl = t.TILES(obs=30, ttl=90, sinks=sinks)
+        snapshots = list(tl.feed(read_edges("%s/gen_simple.tsv" % base)))
+        snapshots.append(tl.close())
+        return snapshots
+
+    def test_queries(self):
+        snapshots = self.run_tiles([t.HistorySink(self.db)])
+        index = t.HistoryIndex(self.db)
+        try:
+            self.assertEqual([r[0] for r in index.slices()], [s.slice for s in snapshots])
+
+            for s in snapshots:
+                for cid, nodes in s.communities.items():
+                    self.assertEqual(index.members(cid, s.slice), nodes)
+
+            # node history against a scan of every observation
+            nodes = set(n for s in snapshots for c in s.communities.values() for n in c)
+            for node in sorted(nodes)[:50]:
+                expected = sorted((s.slice, cid) for s in snapshots for cid, c in s.communities.items() if node in c)
+                found = sorted((s, cid) for cid, f, l in index.node_history(node) for s in range(f, l + 1))
+                self.assertEqual(found, expected)
+                self.assertEqual(index.communities_of(node, 3),
+                                 sorted(cid for cid, c in snapshots[3].communities.items() if node in c))
+
+            first, last = index.slice_range(snapshots[2].start, snapshots[4].start)
+            self.assertEqual((first, last), (2, 4))
+            for cid, f, l in index.node_history(sorted(nodes)[0], first, last):
+                self.assertTrue(first <= f <= l <= last)
+
+            merged = [(s.slice, k, m) for s in snapshots for k, ms in s.merges.items() for m in ms]
+            self.assertTrue(merged)
+            s, k, m = merged[0]
+            self.assertIn((s, k), index.lineage(m)["merged_into"])
+            split = [(s.slice, c, n) for s in snapshots for c, ids in s.splits for n in ids][0]
+            self.assertIn((split[0], split[2]), index.lineage(split[1])["split_into"])
+        finally:
+            index.close()
+
+    def test_resume(self):
+        reference = os.path.join(self.out, "reference.db")
+        self.run_tiles([t.HistorySink(reference)])
+
+        # checkpoint after slice 3, then write slices 4-5 and resume from the checkpoint
+        base = os.path.dirname(os.path.abspath(__file__))
+        edges = list(read_edges("%s/gen_simple.tsv" % base))
+        tl = t.TILES(obs=30, ttl=90, sinks=[t.HistorySink(self.db)])
+        state = None
+        for i, e in enumerate(edges):
+            snapshot = tl.process_edge(*e)
+            if snapshot is not None and snapshot.slice == 3:
+                state = pickle.dumps(tl)
+                position = i + 1
+            if snapshot is not None and snapshot.slice == 5:
+                break
+        tl = pickle.loads(state)
+        for e in edges[position:]:
+            tl.process_edge(*e)
+        tl.close()
+
+        for query in ["SELECT * FROM slices ORDER BY slice",
+                      "SELECT * FROM memberships ORDER BY node, community, first_slice",
+                      "SELECT * FROM merges ORDER BY slice, community, merged",
+                      "SELECT * FROM splits ORDER BY slice, community, component"]:
+            a = t.HistoryIndex(reference)
+            b = t.HistoryIndex(self.db)
+            self.assertEqual(a.db.execute(query).fetchall(), b.db.execute(query).fetchall())
+            a.close()
+            b.close()
+
+    def test_threaded_checkpoint(self):
+        reference = os.path.join(self.out, "reference.db")
+        self.run_tiles([t.HistorySink(reference)])
+
+        # the connection is opened by the writer thread, checkpointed and closed by this one
+        base = os.path.dirname(os.path.abspath(__file__))
+        checkpoint = os.path.join(self.out, "tiles.ckp")
+        tl = t.TILES(filename="%s/gen_simple.tsv" % base, obs=30, ttl=90, path=self.out,
+                     sinks=[t.ThreadedSink(t.HistorySink(self.db))])
+        tl.execute(checkpoint, 0)
+        self.assertFalse(os.path.exists(checkpoint))
+
+        a = t.HistoryIndex(reference)
+        b = t.HistoryIndex(self.db)
+        try:
+            for query in ["SELECT * FROM slices ORDER BY slice",
+                          "SELECT * FROM memberships ORDER BY node, community, first_slice"]:
+                self.assertEqual(a.db.execute(query).fetchall(), b.db.execute(query).fetchall())
+        finally:
+            a.close()
+            b.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import os
+import tiles as t
+from tiles.alg.memberships import Memberships, TUPLE_MAX
+from tiles.alg.reader import read_edges
+
+
+class MembershipsTestCase(unittest.TestCase):
+
+    def test_index(self):
+        m = Memberships()
+        self.assertTrue(m.add(1, 0))
+        self.assertFalse(m.add(1, 0))
+        self.assertTrue(m.add(2, 0))
+        self.assertEqual(m.communities(1), (0,))
+        self.assertEqual(list(m.members[0]), [1, 2])
+
+        # tuple -> dictionary beyond TUPLE_MAX memberships, insertion order kept
+        for cid in range(1, TUPLE_MAX + 2):
+            m.add(1, cid)
+        self.assertIsInstance(m.communities(1), dict)
+        self.assertEqual(list(m.communities(1)), list(range(TUPLE_MAX + 2)))
+
+        self.assertTrue(m.remove(1, 3))
+        self.assertFalse(m.remove(1, 3))
+        self.assertNotIn(3, m.communities(1))
+        self.assertEqual(list(m.members[3]), [])
+
+        m.destroy(0)
+        self.assertNotIn(0, m.members)
+        self.assertEqual(m.communities(2), ())
+        self.assertNotIn(2, m._nodes)
+        self.assertNotIn(0, m.communities(1))
+
+    def test_consistency(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        tl = t.TILES(obs=1, ttl=2)
+        for _ in tl.feed(read_edges("%s/sample_net_tiles.tsv" % base)):
+            pass
+        tl.close()
+
+        pairs = set((n, cid) for cid, com in tl.communities.items() for n in com)
+        index = set((n, cid) for n in tl.g.nodes() for cid in tl.memberships.communities(n))
+        self.assertTrue(len(pairs) > 0)
+        self.assertEqual(pairs, index)
+
+
+if __name__ == '__main__':
+    unittest.main()
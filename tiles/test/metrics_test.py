@@ -0,0 +1,69 @@
+import unittest
+import tiles as t
+import os
+import json
+import shutil
+import tempfile
+from tiles.alg.reader import read_edges
+
+DAY = 86400
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def test_metrics(self):
+        m = t.Metrics()
+        m.incr("a")
+        m.incr("a", 2)
+        m.add_time("x", 0.5)
+        with m.timer("x"):
+            pass
+        m.gauge("g", 7)
+        r0 = m.record(0)
+        self.assertEqual(r0["counters"], {"a": 3})
+        self.assertEqual(r0["gauges"], {"g": 7})
+        self.assertGreaterEqual(r0["timers"]["x"], 0.5)
+
+        # per slice deltas, cumulative totals
+        m.incr("a")
+        r1 = m.record(1)
+        self.assertEqual(r1["counters"], {"a": 1})
+        self.assertLess(r1["timers"]["x"], 0.5)
+        self.assertEqual(m.totals()["counters"], {"a": 4})
+        self.assertEqual([r["slice"] for r in m.history], [0, 1])
+
+    def test_stream_metrics(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        tl = t.TILES(obs=1, ttl=2)
+        snapshots = list(tl.feed(read_edges("%s/sample_net_tiles.tsv" % base)))
+        snapshots.append(tl.close())
+
+        self.assertEqual(len(tl.metrics.history), len(snapshots))
+        for s in snapshots:
+            self.assertEqual(s.metrics["slice"], s.slice)
+            self.assertEqual(s.metrics["counters"]["interactions"], s.added)
+            self.assertEqual(s.metrics["gauges"]["nodes"], s.nodes)
+            self.assertEqual(s.metrics["gauges"]["edges"], len(s.edges))
+            self.assertEqual(s.metrics["gauges"]["communities"], len(s.communities))
+
+        totals = tl.metrics.totals()
+        self.assertEqual(totals["counters"]["removals"], sum(s.removed for s in snapshots))
+        for phase in ["ingest", "remove", "common_neighbors_analysis", "update_shared_coms", "snapshot", "write"]:
+            self.assertIn(phase, totals["timers"])
+
+    def test_jsonl(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        out = tempfile.mkdtemp()
+        try:
+            et = t.eTILES(filename="%s/sample_net_etiles.tsv" % base, obs=1, path=out)
+            et.execute()
+            with open(os.path.join(out, "metrics.jsonl")) as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual([r["slice"] for r in records], list(range(len(records))))
+            self.assertEqual(records, et.metrics.history)
+        finally:
+            shutil.rmtree(out)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import tempfile
+import os
+import io
+import sys
+import time
+import gzip
+import bz2
+import lzma
+from tiles.alg import reader
+
+
+class ReaderTestCase(unittest.TestCase):
+
+    def test_parse_chunk(self):
+        chunk = reader.parse_chunk(b"1\t2\t100\n3\t4\t200\n")
+        self.assertEqual([list(c) for c in chunk], [[1, 3], [2, 4], [100, 200]])
+
+        # float timestamps, blank lines and extra columns
+        chunk = reader.parse_chunk(b"1\t2\t100.7\textra\n\n3\t4\t200\n")
+        self.assertEqual([list(c) for c in chunk], [[1, 3], [2, 4], [100, 200]])
+
+        chunk = reader.parse_chunk(b"+\t1\t2\t100\n-\t1\t2\t300\n", columns=4)
+        self.assertEqual([list(c) for c in chunk],
+                         [[reader.ADD, reader.REMOVE], [1, 1], [2, 2], [100, 300]])
+
+        # CRLF line endings
+        chunk = reader.parse_chunk(b"1\t2\t100\r\n3\t4\t200\r\n")
+        self.assertEqual([list(c) for c in chunk], [[1, 3], [2, 4], [100, 200]])
+
+    def test_malformed_lines(self):
+        # a short line next to a long one must not shift the columns
+        with self.assertRaises((ValueError, IndexError)):
+            reader.parse_chunk(b"1\t2\n3\t4\t100\t5\n")
+        with self.assertRaises((ValueError, IndexError)):
+            reader.parse_chunk(b"1\t2\t3\t4\n5\t100\n", columns=4)
+
+        # fields are tab separated: spaces do not separate them
+        with self.assertRaises((ValueError, IndexError)):
+            reader.parse_chunk(b"1 2 100\n3 4 200\n")
+
+    def test_read_edges(self):
+        fd, fname = tempfile.mkstemp()
+        with os.fdopen(fd, "w") as f:
+            for i in range(1000):
+                f.write("%d\t%d\t%d\n" % (i, i + 1, 1423680079 + i))
+            # no trailing newline on the last record
+            f.write("1000\t1001\t1423681079")
+
+        edges = list(reader.read_edges(fname, chunk_size=64))
+        os.remove(fname)
+
+        self.assertEqual(len(edges), 1001)
+        self.assertEqual(edges[0], (0, 1, 1423680079))
+        self.assertEqual(edges[-1], (1000, 1001, 1423681079))
+        self.assertTrue(all(type(x) is int for x in edges[500]))
+
+    def test_offsets(self):
+        fd, fname = tempfile.mkstemp()
+        with os.fdopen(fd, "w") as f:
+            for i in range(100):
+                f.write("%d\t%d\t%d\n" % (i, i + 1, 1423680079 + i))
+
+        chunks = list(reader.iter_chunks(fname, chunk_size=64))
+        offset = chunks[2][0]
+        rest = [r for _, c in reader.iter_chunks(fname, chunk_size=64, offset=offset) for r in reader.to_records(c)]
+        size = os.path.getsize(fname)
+        os.remove(fname)
+
+        done = [r for _, c in chunks[:3] for r in reader.to_records(c)]
+        self.assertEqual(len(done) + len(rest), 100)
+        self.assertEqual(rest[0], (len(done), len(done) + 1, 1423680079 + len(done)))
+        self.assertEqual(chunks[-1][0], size)
+
+    def test_compressed(self):
+        data = b"".join(b"%d\t%d\t%d\n" % (i, i + 1, 1423680079 + i) for i in range(1000))
+        expected = [(i, i + 1, 1423680079 + i) for i in range(1000)]
+        folder = tempfile.mkdtemp()
+        try:
+            for name, opener in [("edges.tsv.gz", gzip.open), ("edges.bz2", bz2.BZ2File), ("edges.xz", lzma.open),
+                                 ("edges.tsv", open)]:
+                fname = os.path.join(folder, name)
+                with opener(fname, "wb") as f:
+                    f.write(data)
+                self.assertEqual(list(reader.read_edges(fname, chunk_size=256)), expected)
+
+                # resume from an offset of the uncompressed stream
+                chunks = list(reader.iter_chunks(fname, chunk_size=256, threaded=True))
+                rest = [r for _, c in reader.iter_chunks(fname, chunk_size=256, offset=chunks[1][0])
+                        for r in reader.to_records(c)]
+                self.assertEqual(rest, expected[-len(rest):])
+        finally:
+            for name in os.listdir(folder):
+                os.remove(os.path.join(folder, name))
+            os.rmdir(folder)
+
+    def test_stdin(self):
+        stdin = sys.stdin
+
+        class _Stdin(object):
+            buffer = io.BytesIO(b"1\t2\t100\n3\t4\t200\n")
+
+        sys.stdin = _Stdin()
+        try:
+            self.assertEqual(list(reader.read_edges("-")), [(1, 2, 100), (3, 4, 200)])
+        finally:
+            sys.stdin = stdin
+
+    def test_early_stop(self):
+        # a producer that never closes the pipe: the reader thread stays blocked in read()
+        r, w = os.pipe()
+        os.write(w, b"1\t2\t100\n" * 100)
+        f = os.fdopen(r, "rb", 0)
+        try:
+            blocks = reader._read_blocks(f, 1000, True, interactive=True)
+            self.assertTrue(next(blocks))
+            start = time.time()
+            blocks.close()
+            self.assertLess(time.time() - start, reader.DETACH_TIMEOUT + 1)
+
+            # a regular file is read to the end of the pending block, then released
+            fd, fname = tempfile.mkstemp()
+            with os.fdopen(fd, "wb") as out:
+                out.write(b"1\t2\t100\n" * 100000)
+            with open(fname, "rb") as g:
+                blocks = reader._read_blocks(g, 1000, True)
+                next(blocks)
+                blocks.close()
+            os.remove(fname)
+        finally:
+            os.close(w)
+            f.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
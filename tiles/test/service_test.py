@@ -0,0 +1,144 @@
+import unittest
+import tiles as t
+import asyncio
+import json
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+from tiles.alg.reader import read_edges
+from tiles.alg.service import Service, parse_address, serve
+
+
+class _SlowSink(object):
+
+    def write(self, snapshot):
+        time.sleep(0.2)
+
+    def close(self):
+        pass
+
+
+class ServiceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        self.filename = "%s/sample_net_tiles.tsv" % base
+        with open(self.filename, "rb") as f:
+            self.data = f.read()
+
+    def run_producer(self, address, tl, producer, maxsize=2):
+        async def scenario():
+            service = Service(tl, maxsize)
+            actual = await service.start(address)
+            kind = parse_address(actual)
+            if kind[0] == "tcp":
+                reader, writer = await asyncio.open_connection(kind[1], kind[2])
+            else:
+                reader, writer = await asyncio.open_unix_connection(kind[1])
+            result = await producer(reader, writer)
+            writer.close()
+            await service.wait_closed()
+            return result
+
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(scenario())
+        finally:
+            loop.close()
+
+    def test_tcp(self):
+        reference = t.TILES(obs=1, ttl=2)
+        snapshots = list(reference.feed(read_edges(self.filename)))
+        final = reference.close()
+
+        async def producer(reader, writer):
+            # a malformed line, the stream, the commands
+            writer.write(b"1\t2\n")
+            writer.write(self.data)
+            writer.write(b"metrics\nSNAPSHOT\nHELLO\nSHUTDOWN\n")
+            await writer.drain()
+            return [json.loads(line) for line in (await reader.read()).splitlines()]
+
+        replies = self.run_producer("tcp://127.0.0.1:0", t.TILES(obs=1, ttl=2), producer)
+        error, metrics, snapshot, unknown, last = replies
+
+        self.assertEqual(error["line"], "1\t2")
+        self.assertEqual(metrics["counters"]["interactions"], reference.metrics.counters["interactions"])
+        self.assertEqual(snapshot["slice"], snapshots[-1].slice)
+        self.assertEqual(snapshot["communities"], dict((str(k), v) for k, v in snapshots[-1].communities.items()))
+        self.assertIn("error", unknown)
+        self.assertTrue(last["final"])
+        self.assertEqual(last["slice"], final.slice)
+        self.assertEqual(last["communities"], dict((str(k), v) for k, v in final.communities.items()))
+
+    def test_unix_responsive(self):
+        folder = tempfile.mkdtemp()
+        latency = []
+
+        async def producer(reader, writer):
+            async def tick():
+                while True:
+                    start = time.time()
+                    await asyncio.sleep(0.01)
+                    latency.append(time.time() - start)
+
+            ticker = asyncio.ensure_future(tick())
+            writer.write(self.data)
+            writer.write(b"SHUTDOWN\n")
+            await writer.drain()
+            last = json.loads(await reader.read())
+            ticker.cancel()
+            return last
+
+        try:
+            tl = t.TILES(obs=1, ttl=2, sinks=[_SlowSink()])
+            last = self.run_producer("unix:%s" % os.path.join(folder, "tiles.sock"), tl, producer, maxsize=1)
+        finally:
+            shutil.rmtree(folder)
+
+        # six observations written by a slow sink, while the event loop kept running
+        self.assertEqual(last["slice"], 5)
+        self.assertGreater(len(latency), 50)
+        self.assertLess(max(latency), 0.15)
+
+    def test_interrupt(self):
+        folder = tempfile.mkdtemp()
+        address = os.path.join(folder, "tiles.sock")
+        replies = []
+
+        def producer():
+            while not os.path.exists(address):
+                time.sleep(0.01)
+            s = socket.socket(socket.AF_UNIX)
+            s.connect(address)
+            s.sendall(self.data + b"METRICS\n")
+            # the interactions are processed once the reply arrives
+            replies.append(s.makefile("rb").readline())
+            os.kill(os.getpid(), signal.SIGINT)
+            s.close()
+
+        thread = threading.Thread(target=producer)
+        thread.start()
+        try:
+            tl = t.TILES(obs=1, ttl=2, sinks=[t.FileSink(folder)])
+            last = serve(tl, "unix:%s" % address)
+            thread.join()
+
+            # Ctrl-C closes the last observation and the sinks
+            self.assertTrue(replies)
+            self.assertTrue(last.final)
+            self.assertEqual(last.slice, 5)
+            for name in ("graph", "merging", "strong-communities"):
+                self.assertTrue(os.path.exists(os.path.join(folder, "%s-%d.gz" % (name, last.slice))))
+            with open(os.path.join(folder, "extraction_status.txt")) as f:
+                self.assertIn("Finished!", f.read())
+        finally:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import tiles as t
+import tiles.alg.sinks as sinks
+import shutil
+import glob
+import gzip
+import bz2
+import lzma
+import os
+import tempfile
+
+
+class _FailingSink(object):
+
+    def write(self, snapshot):
+        raise IOError("disk full")
+
+    def close(self):
+        pass
+
+
+class SinksTestCase(unittest.TestCase):
+
+    def test_threaded_sink(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        os.makedirs("tres")
+        sink = t.ThreadedSink(t.FileSink("tres"), maxsize=1)
+        tl = t.TILES(filename="%s/sample_net_tiles.tsv" % base, obs=1, path="tres", ttl=2, sinks=[sink])
+        tl.execute()
+
+        self.assertFalse(sink.thread.is_alive())
+        self.assertEqual(len(glob.glob("tres/graph*")), 6)
+        self.assertEqual(len(glob.glob("tres/strong-communities*")), 6)
+        shutil.rmtree("tres")
+
+    def test_threaded_sink_error(self):
+        sink = t.ThreadedSink(_FailingSink())
+        tl = t.TILES(obs=1, sinks=[sink])
+        tl.process_edge(1, 2, 0)
+        tl.process_edge(1, 3, 86400)
+        with self.assertRaises(IOError):
+            sink.flush()
+        sink.close()
+
+    def test_codecs(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        out = tempfile.mkdtemp()
+        block_size = sinks.BLOCK_SIZE
+        # small blocks: every file is made of several concatenated streams
+        sinks.BLOCK_SIZE = 1 << 14
+        try:
+            outputs = {}
+            for codec, threads, opener in [("gzip", 1, gzip.open), ("gzip", 4, gzip.open), ("bz2", 3, bz2.open),
+                                           ("xz", 2, lzma.open), ("none", 2, open)]:
+                folder = os.path.join(out, "%s-%d" % (codec, threads))
+                os.makedirs(folder)
+                tl = t.TILES(filename="%s/sample_net_tiles.tsv" % base, obs=1, ttl=2, path=folder,
+                             codec=codec, compress_threads=threads)
+                tl.execute()
+                ext = sinks.CODECS[codec][0]
+                files = sorted(glob.glob(os.path.join(folder, "*-[0-9]*%s" % ext)))
+                self.assertEqual(len(files), 23)
+                contents = []
+                for fname in files:
+                    with opener(fname, "rt") as f:
+                        contents.append((os.path.basename(fname)[:-len(ext) or None], f.read()))
+                outputs[(codec, threads)] = contents
+            reference = outputs.pop(("gzip", 1))
+            self.assertTrue(any(c for _, c in reference))
+            for contents in outputs.values():
+                self.assertEqual(contents, reference)
+        finally:
+            sinks.BLOCK_SIZE = block_size
+            shutil.rmtree(out)
+
+    def test_failed_write(self):
+        out = tempfile.mkdtemp()
+        block_size = sinks.BLOCK_SIZE
+        sinks.BLOCK_SIZE = 1 << 10
+        try:
+            # an edge that cannot be formatted, after some blocks of the graph file are written
+            edges = [(u, u + 1, 1) for u in range(10000)] + [("x", 1)]
+            snapshot = t.Snapshot(0, 0, 86400, {1: [1, 2, 3]}, {}, [], edges, 10001)
+            for threads in (1, 2):
+                folder = os.path.join(out, str(threads))
+                os.makedirs(folder)
+                sink = t.FileSink(folder, threads=threads)
+                with self.assertRaises(TypeError):
+                    sink.write(snapshot)
+                sink.close()
+                files = sorted(os.listdir(folder))
+                self.assertNotIn("graph-0.gz", files)
+                self.assertFalse([f for f in files if f.endswith(sinks.PARTIAL)])
+        finally:
+            sinks.BLOCK_SIZE = block_size
+            shutil.rmtree(out)
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            t.FileSink(codec="zip")
+
+
+if __name__ == '__main__':
+    unittest.main()
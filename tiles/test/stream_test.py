@@ -0,0 +1,130 @@
+import unittest
+import tiles as t
+import os
+from tiles.alg.reader import read_edges
+
+DAY = 86400
+
+
+class StreamTestCase(unittest.TestCase):
+
+    def test_process_edge(self):
+        tl = t.TILES(obs=1)
+        clique = [(1, 2), (2, 3), (1, 3), (3, 4), (2, 4), (1, 4)]
+        for u, v in clique:
+            self.assertIsNone(tl.process_edge(u, v, 0))
+
+        snapshot = tl.process_edge(5, 6, DAY)
+        self.assertEqual(snapshot.slice, 0)
+        self.assertFalse(snapshot.final)
+        self.assertEqual(list(snapshot.communities.values()), [[1, 2, 3, 4]])
+        self.assertEqual(len(snapshot.edges), 6)
+        self.assertEqual(snapshot.stats()["added"], 6)
+
+        last = tl.close()
+        self.assertTrue(last.final)
+        self.assertEqual(last.slice, 1)
+        self.assertEqual(len(last.edges), 7)
+
+    def test_feed(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        cwd = set(os.listdir("."))
+
+        tl = t.TILES(obs=1, ttl=2)
+        snapshots = list(tl.feed(read_edges("%s/sample_net_tiles.tsv" % base)))
+        snapshots.append(tl.close())
+        self.assertEqual(len(snapshots), 6)
+        self.assertEqual([s.slice for s in snapshots], list(range(6)))
+
+        et = t.eTILES(obs=1)
+        snapshots = list(et.feed(read_edges("%s/sample_net_etiles.tsv" % base, columns=4)))
+        self.assertEqual(len(snapshots), 5)
+
+        # nothing written to disk
+        self.assertEqual(set(os.listdir(".")), cwd)
+
+    def test_merge_detection(self):
+        tl = t.TILES(obs=1)
+        for cid in [tl.new_community_id, tl.new_community_id, tl.new_community_id]:
+            for n in ([1, 2, 3] if cid != 2 else [4, 5, 6]):
+                tl.g.add_node(n)
+                tl.add_to_community(n, cid)
+        # same members, different insertion order
+        c = tl.new_community_id
+        for n in [6, 4, 5]:
+            tl.add_to_community(n, c)
+
+        snapshot = tl.snapshot(0)
+        self.assertEqual(snapshot.communities, {1: [1, 2, 3], 2: [4, 5, 6]})
+        self.assertEqual(snapshot.merges, {1: [3], 2: [4]})
+        self.assertEqual(sorted(tl.communities.keys()), [1, 2])
+
+    def test_fingerprints(self):
+        from tiles.alg.TILES import _node_hash, _MASK
+        base = os.path.dirname(os.path.abspath(__file__))
+        tl = t.TILES(obs=30, ttl=90)
+        for _ in tl.feed(read_edges("%s/gen_simple.tsv" % base)):
+            for cid, com in tl.communities.items():
+                self.assertEqual(tl.fingerprints[cid], sum(_node_hash(n) for n in com) & _MASK)
+        self.assertEqual(set(tl.fingerprints.keys()), set(tl.communities.keys()))
+
+    def test_batch(self):
+        def run(edges, window, **kwargs):
+            tl = t.TILES(**kwargs)
+            snapshots = list(tl.feed(edges, window)) + [tl.close()]
+            return [(s.communities, s.merges, s.splits, sorted(s.edges), s.added, s.removed) for s in snapshots]
+
+        # hourly timestamps, repeated (and reversed) interactions
+        base = os.path.dirname(os.path.abspath(__file__))
+        edges = []
+        for i, (u, v, ts) in enumerate(read_edges("%s/sample_net_tiles.tsv" % base)):
+            ts = ts // 3600 * 3600
+            edges.extend([(u, v, ts)] * (i % 3 + 1))
+            if i % 4 == 0:
+                edges.append((v, u, ts))
+
+        for kwargs in [dict(obs=1), dict(obs=1, ttl=1), dict(obs=2, ttl=3)]:
+            self.assertEqual(run(edges, None, **kwargs), run(edges, 0, **kwargs))
+
+        # micro-windows never span two observations
+        bounds = [(s.start, s.end) for s in t.TILES(obs=1, ttl=2).feed(edges)]
+        tl = t.TILES(obs=1, ttl=2)
+        snapshots = list(tl.feed(edges, 2 * 3600))
+        self.assertEqual([(s.start, s.end) for s in snapshots], bounds)
+        self.assertEqual(sum(s.added for s in snapshots + [tl.close()]), len(edges))
+        self.assertGreater(tl.metrics.counters["coalesced"], 0)
+
+    def test_approximate(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        edges = list(read_edges("%s/gen_simple.tsv" % base))
+
+        def run(approx):
+            tl = t.TILES(obs=30, ttl=90, approx=approx)
+            snapshots = list(tl.feed(edges))
+            snapshots.append(tl.close())
+            return tl, [s.communities for s in snapshots]
+
+        _, exact = run(None)
+        # caps never reached: same result as the exact mode
+        _, unbounded = run(t.Approximation(max_common_neighbors=None, budget=None))
+        self.assertEqual(unbounded, exact)
+
+        tl, approx = run(t.Approximation(max_common_neighbors=2, budget=8))
+        self.assertGreater(tl.metrics.counters["sampled_edges"], 0)
+        self.assertGreater(tl.metrics.counters["exhausted_budgets"], 0)
+        self.assertEqual(len(approx), len(exact))
+        for communities in approx:
+            self.assertTrue(all(len(nodes) > 2 for nodes in communities.values()))
+        # reproducible sampling
+        self.assertEqual(run(t.Approximation(max_common_neighbors=2, budget=8))[1], approx)
+
+        # an exhausted budget does less work, it does not create communities
+        tl = t.TILES(obs=30, approx=t.Approximation(budget=1))
+        for u, v in [(1, 2), (2, 3), (1, 3), (4, 1), (4, 2)]:
+            tl.process_edge(u, v, 1423680079)
+        self.assertEqual(list(tl.communities.values()), [{1: None, 2: None, 3: None}])
+        self.assertEqual(tl.metrics.counters["exhausted_budgets"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import tiles as t
+import gzip
+import os
+import shutil
+import tempfile
+import importlib
+from tiles.alg.reader import read_edges
+from tiles.alg.sweep import grid, config_name
+
+# the module (tiles.alg.sweep is the function once tiles is imported)
+sw = importlib.import_module("tiles.alg.sweep")
+
+
+def _outputs(folder):
+    res = {}
+    for name in os.listdir(folder):
+        if name.endswith(".gz"):
+            with gzip.open(os.path.join(folder, name), "rt") as f:
+                res[name] = f.read()
+    return res
+
+
+class SweepTestCase(unittest.TestCase):
+
+    def test_sweep(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        out = tempfile.mkdtemp()
+        try:
+            configs = grid([1, 2], [1])
+            runs = t.sweep("%s/sample_net_tiles.tsv" % base, configs, out, processes=2)
+            self.assertEqual([r["config"] for r in runs], configs)
+            self.assertEqual(sorted(os.listdir(out)), ["ttl-1_obs-1", "ttl-2_obs-1"])
+
+            single = os.path.join(out, "single")
+            os.makedirs(single)
+            t.TILES(filename="%s/sample_net_tiles.tsv" % base, obs=1, ttl=2, path=single).execute()
+            self.assertEqual(_outputs(os.path.join(out, config_name(configs[1]))), _outputs(single))
+            self.assertEqual(runs[1]["slices"], 6)
+        finally:
+            shutil.rmtree(out)
+
+    def test_sweep_explicit(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        out = tempfile.mkdtemp()
+        try:
+            runs = t.sweep("%s/sample_net_etiles.tsv" % base, grid([float('inf')], [1, 2]), out, explicit=True)
+            self.assertEqual([os.path.basename(r["path"]) for r in runs], ["ttl-inf_obs-1", "ttl-inf_obs-2"])
+            self.assertTrue(os.path.exists(os.path.join(out, "ttl-inf_obs-2", "metrics.jsonl")))
+        finally:
+            shutil.rmtree(out)
+
+    def test_shared_blocks(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        segment = sw.SEGMENT
+        # several blocks, the chunks are split across their boundaries
+        sw.SEGMENT = 1000
+        try:
+            stream = sw.SharedStream("%s/sample_net_tiles.tsv" % base)
+            try:
+                self.assertGreater(len(stream.blocks), 2)
+                self.assertEqual(list(sw._records(stream.blocks, stream.segment, 3)),
+                                 list(read_edges("%s/sample_net_tiles.tsv" % base)))
+            finally:
+                stream.close()
+        finally:
+            sw.SEGMENT = segment
+
+    def test_sweep_params(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        out = tempfile.mkdtemp()
+        try:
+            params = dict(gc=True, approx=t.Approximation(8, 256), codec="bz2")
+            runs = t.sweep("%s/sample_net_tiles.tsv" % base, grid([2], [1, 2]), out, window=0, background=True,
+                           events=True, **params)
+            folder = runs[0]["path"]
+            self.assertTrue(os.path.exists(os.path.join(folder, "events.jsonl")))
+            self.assertTrue(os.path.exists(os.path.join(folder, "graph-0.bz2")))
+
+            single = os.path.join(out, "single")
+            os.makedirs(single)
+            tl = t.TILES(filename="%s/sample_net_tiles.tsv" % base, obs=1, ttl=2, path=single, **params)
+            tl.execute(window=0)
+            for name in ("strong-communities-3.bz2", "graph-5.bz2"):
+                with open(os.path.join(folder, name), "rb") as a, open(os.path.join(single, name), "rb") as b:
+                    self.assertEqual(a.read(), b.read())
+        finally:
+            shutil.rmtree(out)
+
+
+if __name__ == '__main__':
+    unittest.main()
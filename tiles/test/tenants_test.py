@@ -0,0 +1,63 @@
+import unittest
+import tiles as t
+import glob
+import gzip
+import os
+import shutil
+import tempfile
+
+
+class TenantsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.out = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.out)
+
+    def outputs(self, folder):
+        contents = {}
+        for fname in glob.glob(os.path.join(folder, "*.gz")):
+            with gzip.open(fname, "rt") as f:
+                contents[os.path.basename(fname)] = f.read()
+        return contents
+
+    def test_tenants(self):
+        base = os.path.dirname(os.path.abspath(__file__))
+        with open("%s/sample_net_tiles.tsv" % base) as f:
+            lines = [l for l in f if l.strip()]
+
+        # three tenants interleaved: the whole stream, its even and its odd lines
+        streams = {"all": lines, "even": lines[::2], "odd": lines[1::2]}
+        with open(os.path.join(self.out, "tenants.tsv"), "w") as f:
+            for i, line in enumerate(lines):
+                f.write("all\t%s" % line)
+                f.write("%s\t%s" % ("even" if i % 2 == 0 else "odd", line))
+
+        summary = t.run_tenants(os.path.join(self.out, "tenants.tsv"), os.path.join(self.out, "res"),
+                                processes=2, obs=1, ttl=2)
+        self.assertEqual(sorted(summary), sorted(streams))
+
+        for tenant, stream in streams.items():
+            folder = os.path.join(self.out, "ref-%s" % tenant)
+            os.makedirs(folder)
+            with open(os.path.join(folder, "stream.tsv"), "w") as f:
+                f.writelines(stream)
+            tl = t.TILES(filename=os.path.join(folder, "stream.tsv"), obs=1, ttl=2, path=folder)
+            tl.execute()
+
+            self.assertEqual(summary[tenant]["interactions"], len(stream))
+            self.assertEqual(summary[tenant]["slices"], tl.actual_slice)
+            expected = self.outputs(folder)
+            self.assertTrue(expected)
+            self.assertEqual(self.outputs(summary[tenant]["path"]), expected)
+
+    def test_invalid_tenant(self):
+        with open(os.path.join(self.out, "tenants.tsv"), "w") as f:
+            f.write("../x\t1\t2\t1000\n")
+        with self.assertRaises(ValueError):
+            t.run_tenants(os.path.join(self.out, "tenants.tsv"), self.out, processes=1, obs=1)
+
+
+if __name__ == '__main__':
+    unittest.main()